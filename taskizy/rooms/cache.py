@@ -0,0 +1,148 @@
+"""
+Versioned cache of the serialized room list of each user.
+
+Every room has a version counter in the cache, and so does the set of
+rooms of every user. A cached room list stores the versions it was built
+from and is only served while all of them are unchanged, so bumping the
+version of a room on write is enough to never serve a stale list.
+
+Works with any Django cache backend, e.g. the local-memory and file ones.
+"""
+
+from time import time_ns
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+ROOM_VERSION_KEY = "rooms:room-version:{}"
+USER_ROOMS_VERSION_KEY = "rooms:user-rooms-version:{}"
+ROOM_LIST_KEY = "rooms:room-list:{}"
+HITS_KEY = "rooms:room-list-hits"
+MISSES_KEY = "rooms:room-list-misses"
+
+
+def get_cache():
+    return caches[settings.ROOM_LIST_CACHE_ALIAS]
+
+
+def get_versions(keys):
+    """
+    Return the current version of each key.
+
+    Missing versions (never set, or evicted) start from the current time,
+    so they never repeat a version that a cached room list was built from.
+    """
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+
+    for key in missing:
+        cache.add(key, time_ns(), timeout=None)
+
+    if missing:
+        versions.update(cache.get_many(missing))
+
+    return versions
+
+
+def bump_versions(keys):
+    cache = get_cache()
+
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time_ns(), timeout=None)
+
+
+def bump_rooms(room_ids):
+    """
+    Invalidate the cached room lists that contain any of the rooms, once the
+    current transaction commits.
+    """
+    keys = [ROOM_VERSION_KEY.format(pk) for pk in set(room_ids) if pk is not None]
+    transaction.on_commit(lambda: bump_versions(keys))
+
+
+def bump_user_rooms(user_ids):
+    """
+    Invalidate the cached room lists of the users, once the current
+    transaction commits.
+    """
+    keys = [
+        USER_ROOMS_VERSION_KEY.format(pk) for pk in set(user_ids) if pk is not None
+    ]
+    transaction.on_commit(lambda: bump_versions(keys))
+
+
+def count(key):
+    cache = get_cache()
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_room_list(user_id, get_room_ids, serialize_rooms):
+    """
+    Return the serialized room list of the user, from the cache when none of
+    its rooms changed since it was cached.
+
+    `get_room_ids()` returns the ids of the rooms of the user and
+    `serialize_rooms(room_ids)` serializes them on a cache miss.
+    """
+    cache = get_cache()
+    list_key = ROOM_LIST_KEY.format(user_id)
+    user_version_key = USER_ROOMS_VERSION_KEY.format(user_id)
+
+    # Versions are read before the rooms, so a write that commits while the
+    # list is built makes the cached copy stale instead of wrong
+    user_version = get_versions([user_version_key])[user_version_key]
+    cached = cache.get(list_key)
+
+    if cached is not None and cached["user_version"] == user_version:
+        room_versions = get_versions(list(cached["room_versions"]))
+
+        if room_versions == cached["room_versions"]:
+            count(HITS_KEY)
+            return cached["data"]
+
+    count(MISSES_KEY)
+
+    room_ids = list(get_room_ids())
+    room_versions = get_versions([ROOM_VERSION_KEY.format(pk) for pk in room_ids])
+    data = serialize_rooms(room_ids)
+
+    cache.set(
+        list_key,
+        {
+            "user_version": user_version,
+            "room_versions": room_versions,
+            "data": data,
+        },
+        timeout=settings.ROOM_LIST_CACHE_TIMEOUT,
+    )
+
+    return data
+
+
+def get_stats():
+    cache = get_cache()
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = stats.get(HITS_KEY, 0)
+    misses = stats.get(MISSES_KEY, 0)
+    total = hits + misses
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,174 @@
+"""
+Push channel of the changes made to each room.
+
+Views publish an event once their transaction commits, and every client
+streaming `RoomEventsView` of the room receives it, so open rooms are kept
+up to date without polling.
+
+Events are encoded once, as a server-sent event, and the broker fans the
+encoded message out to the subscriptions of the room. Streams wait on the
+event loop, so they are only served under ASGI.
+
+`InMemoryBroker` only reaches the clients connected to the process that
+made the change, so it needs the API to be served by a single worker
+process; `ROOM_EVENTS_BROKER` names the broker class, so a shared one can
+be plugged in for several workers or nodes.
+"""
+
+import asyncio
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from taskizy.renderers import FastJSONRenderer
+
+
+TASKS_CREATED = "tasks.created"
+TASK_UPDATED = "task.updated"
+TASK_DELETED = "task.deleted"
+TASKS_BULK_CHANGED = "tasks.bulk_changed"
+MEMBERS_ADDED = "members.added"
+MEMBERS_REMOVED = "members.removed"
+ROOM_UPDATED = "room.updated"
+ROOM_DELETED = "room.deleted"
+
+# Sent to a client that fell too far behind, which has to re-fetch the room
+RESYNC_MESSAGE = "event: resync\ndata: {}\n\n"
+KEEP_ALIVE_MESSAGE = ": keep-alive\n\n"
+
+
+def encode(event, data, change_seq=None):
+    data = FastJSONRenderer().render(data).decode()
+    message = f"event: {event}\ndata: {data}\n\n"
+
+    # Clients resume from the Last-Event-ID with the room's changes endpoint
+    if change_seq is not None:
+        message = f"id: {change_seq}\n{message}"
+
+    return message
+
+
+class Subscription:
+    """
+    The queue of messages of a room for one client, read with `get` from the
+    event loop of the client. A subscription that has more than `max_queued`
+    unread messages stops receiving and is marked `overflowed`.
+    """
+
+    def __init__(self, broker, room_id, max_queued, loop):
+        self.broker = broker
+        self.room_id = room_id
+        self.loop = loop
+        self.overflowed = False
+        self.queue = asyncio.Queue(max_queued)
+
+    def put(self, message):
+        """
+        Queue a message from any thread.
+        """
+        try:
+            self.loop.call_soon_threadsafe(self.put_nowait, message)
+        except RuntimeError:
+            # The loop of the client is closed
+            self.close()
+
+    def put_nowait(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.close()
+
+    async def get(self, timeout):
+        """
+        The next message, or None if there was none within `timeout` seconds.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """
+    Fan messages out to the subscriptions of a room within this process.
+    """
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.lock = Lock()
+
+    def subscribe(self, room_id, loop):
+        subscription = Subscription(
+            self, room_id, settings.ROOM_EVENTS_QUEUE_SIZE, loop=loop
+        )
+
+        with self.lock:
+            self.subscriptions.setdefault(room_id, set()).add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.room_id, set())
+            subscriptions.discard(subscription)
+
+            if not subscriptions:
+                self.subscriptions.pop(subscription.room_id, None)
+
+    def publish(self, room_id, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(room_id, ()))
+
+        for subscription in subscriptions:
+            subscription.put(message)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.ROOM_EVENTS_BROKER)()
+
+
+def publish(room_id, event, data, change_seq=None):
+    """
+    Send an event to the clients of the room, once the current transaction
+    commits.
+    """
+    message = encode(event, data, change_seq)
+    transaction.on_commit(lambda: get_broker().publish(int(room_id), message))
+
+
+async def stream(room_id):
+    """
+    The messages of the room as they are published, with keep-alive comments
+    while there are none.
+
+    Django doesn't stop streams whose client disconnected, so a stream ends
+    after `ROOM_EVENTS_MAX_AGE` seconds, and clients that are still there
+    reconnect with their Last-Event-ID.
+    """
+    loop = asyncio.get_running_loop()
+    ends_on = loop.time() + settings.ROOM_EVENTS_MAX_AGE
+    subscription = get_broker().subscribe(int(room_id), loop=loop)
+
+    try:
+        # Sent at once, so proxies and clients see the stream is open
+        yield KEEP_ALIVE_MESSAGE
+
+        while (remaining := ends_on - loop.time()) > 0:
+            message = await subscription.get(
+                min(settings.ROOM_EVENTS_KEEP_ALIVE, remaining)
+            )
+
+            if subscription.overflowed:
+                yield RESYNC_MESSAGE
+                return
+
+            yield KEEP_ALIVE_MESSAGE if message is None else message
+    finally:
+        subscription.close()
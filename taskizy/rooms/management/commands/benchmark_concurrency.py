@@ -0,0 +1,93 @@
+"""
+Load a running deployment with concurrent GET requests and report the
+requests per second and the latency percentiles.
+
+Run it once against each deployment, with the same number of worker
+processes so both get the same memory budget, e.g.
+
+    gunicorn taskizy.wsgi --workers 2
+    gunicorn taskizy.asgi --workers 2 --worker-class uvicorn.workers.UvicornWorker
+
+    python manage.py benchmark_concurrency http://127.0.0.1:8000/api/rooms/ \
+        --token <access token> --concurrency 64 --requests 5000
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from threading import local
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Measure requests/sec and latency of a URL under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+")
+        parser.add_argument("--token", help="Access token sent as 'JWT <token>'.")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"JWT {options['token']}"
+
+        for url in options["urls"]:
+            self.benchmark(url, headers, options["concurrency"], options["requests"])
+
+    def benchmark(self, url, headers, concurrency, request_count):
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        connection_class = (
+            HTTPSConnection if parts.scheme == "https" else HTTPConnection
+        )
+        connections = local()
+
+        def request(_):
+            # Connections are kept alive per thread when the server allows it
+            connection = getattr(connections, "connection", None)
+            if connection is None:
+                connection = connections.connection = connection_class(parts.netloc)
+
+            start = perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except OSError:
+                connections.connection = None
+                connection.close()
+                return None
+
+            if response.will_close:
+                connections.connection = None
+                connection.close()
+
+            return response.status, perf_counter() - start
+
+        start = perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(request, range(request_count)))
+        elapsed = perf_counter() - start
+
+        latencies = sorted(result[1] for result in results if result is not None)
+        if not latencies:
+            raise CommandError(f"Every request to {url} failed.")
+
+        errors = sum(1 for result in results if result is None or result[0] >= 400)
+
+        def percentile(value):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * value))]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(url))
+        self.stdout.write(
+            self.style.MIGRATE_LABEL(
+                f"  {request_count / elapsed:.1f} requests/sec, "
+                f"p50 {percentile(0.5) * 1000:.1f} ms, "
+                f"p99 {percentile(0.99) * 1000:.1f} ms, "
+                f"{errors} error(s)"
+            )
+        )
@@ -0,0 +1,108 @@
+"""
+Compare DRF's JSON renderer and parser with the orjson backed ones on real
+RoomView payloads.
+
+The room is created inside a transaction that is rolled back, so the
+command can run against any database, e.g.
+
+    python manage.py benchmark_json --members 50 --tasks 200 --repeat 500
+"""
+
+from io import BytesIO
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rooms.models import Room, RoomMember
+from rooms.views import RoomView
+from taskizy import parsers, renderers
+from tasks.models import Task
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark the JSON renderers and parsers on RoomView payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--members", type=int, default=20)
+        parser.add_argument("--tasks", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError("orjson isn't installed, there is nothing to compare.")
+
+        with transaction.atomic():
+            data = self.get_payload(options["members"], options["tasks"])
+            transaction.set_rollback(True)
+
+        rendered = JSONRenderer().render(data)
+        if renderers.FastJSONRenderer().render(data) != rendered:
+            raise CommandError("The renderers returned different output.")
+
+        repeat = options["repeat"]
+        size = len(rendered)
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f"RoomView payload of {size} bytes")
+        )
+
+        benchmarks = {
+            "JSONRenderer": lambda: JSONRenderer().render(data),
+            "FastJSONRenderer": lambda: renderers.FastJSONRenderer().render(data),
+            "JSONParser": lambda: JSONParser().parse(BytesIO(rendered)),
+            "FastJSONParser": lambda: parsers.FastJSONParser().parse(
+                BytesIO(rendered)
+            ),
+        }
+
+        for name, run in benchmarks.items():
+            start = perf_counter()
+            for _ in range(repeat):
+                run()
+            elapsed = (perf_counter() - start) / repeat
+
+            self.stdout.write(
+                self.style.MIGRATE_LABEL(
+                    f"  {name}: {elapsed * 1000:.3f} ms per payload, "
+                    f"{size / elapsed / 1024 / 1024:.1f} MB/s"
+                )
+            )
+
+    def get_payload(self, member_count, task_count):
+        users = User.objects.bulk_create(
+            User(
+                first_name="Benchmark",
+                last_name=f"User {index}",
+                email=f"benchmark-{index}@bench.taskizy.com",
+                password="!",
+            )
+            for index in range(max(member_count, 1))
+        )
+        room = Room.objects.create(room_name="Benchmark room", room_admin=users[0])
+        RoomMember.objects.bulk_create(
+            RoomMember(room=room, room_member=user) for user in users
+        )
+        Task.objects.bulk_create(
+            Task(
+                description=f"Benchmark task {index}",
+                is_completed=index % 3 == 0,
+                creator=users[0],
+                tasker=users[index % len(users)],
+                room=room,
+            )
+            for index in range(task_count)
+        )
+
+        request = APIRequestFactory().get(f"/api/room/{room.pk}/{room.room_slug}/")
+        force_authenticate(request, users[0])
+        response = RoomView.as_view()(
+            request, room_id=room.pk, room_slug=room.room_slug
+        )
+
+        return response.data
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, Q
+from rooms.models import Room
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the stored task counters of every room."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report rooms whose counters are wrong, without fixing them.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stale_rooms = self.get_stale_rooms()
+
+            for room in stale_rooms:
+                self.stdout.write(
+                    f"Room {room.room_id}: stored {room.task_count} tasks, "
+                    f"{room.completed_task_count} completed; "
+                    f"actual {room.actual_task_count} tasks, "
+                    f"{room.actual_completed_task_count} completed."
+                )
+
+            if options["check"]:
+                if stale_rooms:
+                    raise CommandError(
+                        f"{len(stale_rooms)} room(s) have stale task counters."
+                    )
+
+                self.stdout.write(self.style.SUCCESS("All room counters are correct."))
+                return
+
+            updated = Room.objects.recount_tasks()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Recounted the tasks of {updated} room(s).")
+        )
+
+    def get_stale_rooms(self):
+        rooms = Room.objects.annotate(
+            actual_task_count=Count("task"),
+            actual_completed_task_count=Count(
+                "task", filter=Q(task__is_completed=True)
+            ),
+        )
+
+        return list(
+            rooms.exclude(
+                task_count=F("actual_task_count"),
+                completed_task_count=F("actual_completed_task_count"),
+            ).order_by("room_id")
+        )
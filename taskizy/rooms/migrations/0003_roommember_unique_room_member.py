@@ -0,0 +1,36 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+def remove_duplicate_room_members(apps, schema_editor):
+    RoomMember = apps.get_model("rooms", "RoomMember")
+
+    duplicates = (
+        RoomMember.objects.values("room", "room_member")
+        .annotate(first_id=models.Min("id"), total=models.Count("id"))
+        .filter(total__gt=1)
+    )
+
+    for duplicate in duplicates:
+        RoomMember.objects.filter(
+            room=duplicate["room"],
+            room_member=duplicate["room_member"],
+        ).exclude(id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_room_members, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='roommember',
+            constraint=models.UniqueConstraint(fields=('room', 'room_member'), name='unique_room_member'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:28
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_room_tasks(apps, schema_editor):
+    Room = apps.get_model("rooms", "Room")
+    Task = apps.get_model("tasks", "Task")
+
+    tasks = Task.objects.filter(room=models.OuterRef("pk")).order_by().values("room")
+
+    def count(queryset):
+        return Coalesce(
+            models.Subquery(
+                queryset.annotate(total=models.Count("pk")).values("total")
+            ),
+            0,
+        )
+
+    Room.objects.update(
+        task_count=count(tasks),
+        completed_task_count=count(tasks.filter(is_completed=True)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0003_roommember_unique_room_member'),
+        ('tasks', '0003_task_task_room_completed_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='completed_task_count',
+            field=models.IntegerField(default=0, verbose_name='completed_task_count'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='task_count',
+            field=models.IntegerField(default=0, verbose_name='task_count'),
+        ),
+        migrations.RunPython(count_room_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0004_room_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True, verbose_name='updated_on'),
+        ),
+    ]
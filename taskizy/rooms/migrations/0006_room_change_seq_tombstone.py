@@ -0,0 +1,54 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def stamp_rooms(apps, schema_editor):
+    # Existing rooms and members are the first change, so clients syncing
+    # from 0 receive them
+    apps.get_model("rooms", "Room").objects.update(change_seq=1)
+    apps.get_model("rooms", "RoomMember").objects.update(change_seq=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0005_room_updated_on'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'task'), ('member', 'member')], max_length=6, verbose_name='kind')),
+                ('object_id', models.BigIntegerField(verbose_name='object_id')),
+                ('change_seq', models.BigIntegerField(verbose_name='change_seq')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, verbose_name='change_seq'),
+        ),
+        migrations.AddField(
+            model_name='roommember',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, verbose_name='change_seq'),
+        ),
+        migrations.AddIndex(
+            model_name='roommember',
+            index=models.Index(fields=['room', 'change_seq'], name='roommember_room_change_seq_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='room',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rooms.room', verbose_name='room_id'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['room', 'change_seq'], name='tombstone_room_change_seq_idx'),
+        ),
+        migrations.RunPython(stamp_rooms, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,106 @@
 from django.db import models
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
+from . import cache
 
 
 User = get_user_model()
 
 
+class RoomQuerySet(models.QuerySet):
+    def adjust_task_counts(self, room_id, tasks=0, completed_tasks=0):
+        """
+        Shift the stored task counters of the room by the given amounts.
+        """
+        updated = self.filter(pk=room_id).update(
+            task_count=F("task_count") + tasks,
+            completed_task_count=F("completed_task_count") + completed_tasks,
+            updated_on=timezone.now(),
+        )
+
+        # The counters are part of the cached room lists
+        cache.bump_rooms([room_id])
+
+        return updated
+
+    def next_change_seq(self, room_id):
+        """
+        Allocate the next number of the change sequence of the room.
+
+        The room row stays locked until the transaction ends, so changes of
+        a room commit in the order of their numbers.
+        """
+        self.filter(pk=room_id).update(change_seq=F("change_seq") + 1)
+        return self.filter(pk=room_id).values_list("change_seq", flat=True).get()
+
+    def touch(self, room_ids):
+        """
+        Mark the rooms as changed, for the HTTP validators of room reads and
+        the cached room lists.
+        """
+        room_ids = list(room_ids)
+        updated = self.filter(pk__in=room_ids).update(updated_on=timezone.now())
+        cache.bump_rooms(room_ids)
+
+        return updated
+
+    def recount_tasks(self):
+        """
+        Recompute the stored task counters of the rooms from the task table,
+        and mark the rooms whose counters were wrong as changed.
+        """
+        from tasks.models import Task
+
+        tasks = Task.objects.filter(room=OuterRef("pk")).order_by().values("room")
+
+        def count(queryset):
+            return Coalesce(
+                Subquery(queryset.annotate(total=Count("pk")).values("total")),
+                0,
+            )
+
+        counts = {
+            "task_count": count(tasks),
+            "completed_task_count": count(tasks.filter(is_completed=True)),
+        }
+        room_ids = list(
+            self.alias(
+                actual_task_count=counts["task_count"],
+                actual_completed_task_count=counts["completed_task_count"],
+            )
+            .exclude(
+                task_count=F("actual_task_count"),
+                completed_task_count=F("actual_completed_task_count"),
+            )
+            .values_list("pk", flat=True)
+        )
+
+        updated = self.filter(pk__in=room_ids).update(
+            **counts, updated_on=timezone.now()
+        )
+        cache.bump_rooms(room_ids)
+
+        return updated
+
+    def with_members(self):
+        """
+        Prefetch the members of each room together with their users, in one
+        query for all rooms.
+        """
+        return self.prefetch_related(room_members_prefetch())
+
+
+def room_members_prefetch():
+    return Prefetch(
+        "roommember_set",
+        queryset=RoomMember.objects.select_related("room_member").order_by("pk"),
+    )
+
+
 class Room(models.Model):
     room_id = models.BigAutoField(
         _("room_ID"),
@@ -27,6 +121,12 @@ class Room(models.Model):
         auto_now_add=True,
     )
 
+    # Changed with the room, its members and its tasks
+    updated_on = models.DateTimeField(
+        _("updated_on"),
+        auto_now=True,
+    )
+
     room_admin = models.ForeignKey(
         User,
         verbose_name=_("room_admin"),
@@ -37,10 +137,27 @@ class Room(models.Model):
 
     room_slug = models.SlugField(_("room_slug"))
 
+    task_count = models.IntegerField(_("task_count"), default=0)
+
+    completed_task_count = models.IntegerField(_("completed_task_count"), default=0)
+
+    # Last number of the change sequence that stamps its tasks, members and
+    # tombstones when they change
+    change_seq = models.BigIntegerField(_("change_seq"), default=0)
+
+    objects = RoomQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         self.room_slug = slugify(self.room_name)
         super(Room, self).save(*args, **kwargs)
 
+    @property
+    def task_completed_perc(self):
+        try:
+            return round((self.completed_task_count / self.task_count) * 100)
+        except ZeroDivisionError:
+            return 0
+
     def __str__(self):
         return self.room_name
 
@@ -60,6 +177,60 @@ class RoomMember(models.Model):
         null=True,
         blank=False,
     )
+    change_seq = models.BigIntegerField(_("change_seq"), default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["room", "room_member"],
+                name="unique_room_member",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["room", "change_seq"],
+                name="roommember_room_change_seq_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.room_member.get_full_name
+
+
+class Tombstone(models.Model):
+    """
+    A deleted task or a removed member of a room, kept for the clients that
+    sync the room from before the change.
+    """
+
+    TASK = "task"
+    MEMBER = "member"
+    KINDS = [(TASK, _("task")), (MEMBER, _("member"))]
+
+    room = models.ForeignKey(
+        Room,
+        verbose_name=_("room_id"),
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField(_("kind"), max_length=6, choices=KINDS)
+    # The task_id of a task, the user id of a member
+    object_id = models.BigIntegerField(_("object_id"))
+    change_seq = models.BigIntegerField(_("change_seq"))
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["room", "change_seq"],
+                name="tombstone_room_change_seq_idx",
+            ),
+        ]
+
+    @classmethod
+    def bury(cls, room_id, kind, object_ids, change_seq):
+        """
+        Record the tasks or members as removed from the room.
+        """
+        return cls.objects.bulk_create(
+            cls(room_id=room_id, kind=kind, object_id=pk, change_seq=change_seq)
+            for pk in object_ids
+        )
@@ -0,0 +1,68 @@
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.permissions import BasePermission
+from .models import Room, RoomMember
+
+
+def get_room(request, room_id):
+    """
+    Return the room with the caller's membership, memoized on the request.
+
+    The room, its admin and whether the caller is a member are fetched in a
+    single query. Returns None when the room does not exist.
+    """
+    room_id = int(room_id)
+    rooms = getattr(request, "_resolved_rooms", None)
+
+    if rooms is None:
+        rooms = request._resolved_rooms = {}
+
+    if room_id not in rooms:
+        rooms[room_id] = (
+            Room.objects.select_related("room_admin")
+            .annotate(
+                is_member=Exists(
+                    RoomMember.objects.filter(
+                        room=OuterRef("pk"),
+                        room_member=request.user.id,
+                    )
+                )
+            )
+            .filter(room_id=room_id)
+            .first()
+        )
+
+    return rooms[room_id]
+
+
+class IsRoomMember(BasePermission):
+    """
+    Allows access to members and the admin of the room in the `room_id` URL
+    keyword. Other users get a 404, as if the room did not exist.
+    """
+
+    def has_permission(self, request, view):
+        room = get_room(request, view.kwargs["room_id"])
+
+        if room is None:
+            raise NotFound("Room does not exist.")
+
+        if not (room.is_member or room.room_admin_id == request.user.id):
+            raise NotFound("Room does not exist.")
+
+        return True
+
+
+class IsRoomAdmin(BasePermission):
+    """
+    Allows access to the admin of the room in the `room_id` URL keyword only.
+    Use after `IsRoomMember`, so other members get a 403 and outsiders a 404.
+    """
+
+    def has_permission(self, request, view):
+        room = get_room(request, view.kwargs["room_id"])
+
+        if room is None or room.room_admin_id != request.user.id:
+            raise PermissionDenied("Only the room admin can do this.")
+
+        return True
@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from rest_framework.utils import html
 from django.contrib.auth import get_user_model
-from .models import Room, RoomMember
-from tasks.models import Task
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from .models import Room, RoomMember, Tombstone, room_members_prefetch
+from . import cache as room_list_cache
 from users.serializers import UserSerializer
 from tasks.serializers import TasksListSerializer
 import json
@@ -10,11 +13,27 @@ import json
 User = get_user_model()
 
 
+def get_room_members(room):
+    """
+    Return the users that are members of the room.
+
+    Rooms loaded through `Room.objects.with_members()` are served from the
+    prefetch cache, other rooms are prefetched here with one query.
+    """
+    prefetch_related_objects([room], room_members_prefetch())
+
+    return [
+        member.room_member
+        for member in room.roommember_set.all()
+        if member.room_member is not None
+    ]
+
+
 class RoomsListSerializer(serializers.ModelSerializer):
     room_admin = UserSerializer(many=False, read_only=True)
     room_members = serializers.SerializerMethodField()
-    task_completed_perc = serializers.SerializerMethodField()
-    tasks_count = serializers.SerializerMethodField()
+    task_completed_perc = serializers.IntegerField(read_only=True)
+    tasks_count = serializers.IntegerField(source="task_count", read_only=True)
 
     class Meta:
         model = Room
@@ -30,42 +49,14 @@ class RoomsListSerializer(serializers.ModelSerializer):
         ]
 
     def get_room_members(self, obj):
-        members = RoomMember.objects.filter(room=obj)
-        member_serialized = [
-            UserSerializer(User.objects.get(pk=member.room_member_id)).data
-            for member in members
-        ]
-
-        return member_serialized
-
-    def get_task_completed_perc(self, obj):
-        try:
-            tasks_count = Task.objects.filter(room=obj).count()
-            completed_tasks_count = (
-                Task.objects.filter(room=obj).filter(is_completed=True).count()
-            )
-
-            percentage = round((completed_tasks_count / tasks_count) * 100)
-
-            return percentage
-        except ZeroDivisionError:
-            return 0
-
-    def get_tasks_count(self, obj):
-        try:
-            tasks_count = Task.objects.filter(room=obj).count()
-            return tasks_count
-        except Room.DoesNotExist:
-            raise serializers.ValidationError(
-                "Room with the specified ID does not exist"
-            )
+        return UserSerializer(get_room_members(obj), many=True).data
 
 
 class RoomSerializer(serializers.ModelSerializer):
     room_admin = UserSerializer(read_only=True)
     room_members = serializers.SerializerMethodField()
-    task_count = serializers.SerializerMethodField()
-    task_completed_perc = serializers.SerializerMethodField()
+    task_count = serializers.IntegerField(read_only=True)
+    task_completed_perc = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Room
@@ -88,42 +79,25 @@ class RoomSerializer(serializers.ModelSerializer):
                 "User with the specified ID does not exist"
             )
 
-        room = Room.objects.create(
-            room_admin=room_admin,
-            **validated_data,
-        )
+        # The room starts at the first change of its sequence, the admin's
+        # membership, so a client syncing from 0 receives it
+        with transaction.atomic():
+            room = Room.objects.create(
+                room_admin=room_admin,
+                change_seq=1,
+                **validated_data,
+            )
 
-        RoomMember.objects.create(
-            room=room,
-            room_member=room_admin,
-        )
+            RoomMember.objects.create(
+                room=room,
+                room_member=room_admin,
+                change_seq=room.change_seq,
+            )
 
         return room
 
     def get_room_members(self, obj):
-        members = RoomMember.objects.filter(room=obj)
-        member_serialized = [
-            UserSerializer(User.objects.get(pk=member.room_member_id)).data
-            for member in members
-        ]
-
-        return member_serialized
-
-    def get_task_count(self, obj):
-        return Task.objects.filter(room=obj).count()
-
-    def get_task_completed_perc(self, obj):
-        try:
-            tasks_count = Task.objects.filter(room=obj).count()
-            completed_tasks_count = (
-                Task.objects.filter(room=obj).filter(is_completed=True).count()
-            )
-
-            percentage = round((completed_tasks_count / tasks_count) * 100)
-
-            return percentage
-        except ZeroDivisionError:
-            return 0
+        return UserSerializer(get_room_members(obj), many=True).data
 
 
 class RoomAdminUpdateSerializer(serializers.Serializer):
@@ -155,24 +129,141 @@ class RoomMembersListSerializer(serializers.ModelSerializer):
         fields = ["room_member"]
 
 
+class NewMemberField(serializers.Field):
+    """
+    A user to add to a room, given as its ID or as a `{"value": <ID>}` option
+    of the invite dialog.
+    """
+
+    default_error_messages = {"invalid": "Expected a user ID."}
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            data = data.get("value")
+
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail("invalid")
+
+    def to_representation(self, value):
+        return value
+
+
+class NewMembersField(serializers.ListField):
+    child = NewMemberField()
+
+    def get_value(self, dictionary):
+        # Form submissions still send the list as a single JSON string
+        if html.is_html_input(dictionary):
+            value = dictionary.get(self.field_name, "")
+
+            if value.lstrip().startswith("["):
+                return value
+
+        return super().get_value(dictionary)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except json.JSONDecodeError:
+                raise serializers.ValidationError("Invalid JSON format.")
+
+        return super().to_internal_value(data)
+
+
 class RoomMembersCreateSerializer(serializers.Serializer):
-    room_id = serializers.IntegerField()
-    new_members = serializers.CharField()
+    """
+    Adds users to the room given to `save(room=...)`, which is the room of
+    the URL the caller's membership was checked against.
+    """
+
+    new_members = NewMembersField(allow_empty=False)
 
     def create(self, validated_data):
-        room_id = validated_data["room_id"]
-        new_members = validated_data["new_members"]
-        room = Room.objects.get(pk=room_id)
+        room = validated_data["room"]
+        room_id = room.room_id
+        user_ids = list(dict.fromkeys(validated_data["new_members"]))
+
+        with transaction.atomic():
+            self.change_seq = Room.objects.next_change_seq(room_id)
+            users = set(
+                User.objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+            )
+            current_member_ids = set(
+                RoomMember.objects.filter(
+                    room_id=room_id,
+                    room_member__in=user_ids,
+                ).values_list("room_member_id", flat=True)
+            )
 
-        # Parse the JSON string into a list of dictionaries
-        try:
-            new_members = json.loads(new_members)
-        except json.JSONDecodeError:
-            raise serializers.ValidationError("Invalid JSON format.'")
+            new_member_ids = [
+                user_id
+                for user_id in user_ids
+                if user_id in users and user_id not in current_member_ids
+            ]
+
+            # Memberships added concurrently are skipped by the unique constraint
+            RoomMember.objects.bulk_create(
+                [
+                    RoomMember(
+                        room_id=room_id,
+                        room_member_id=user_id,
+                        change_seq=self.change_seq,
+                    )
+                    for user_id in new_member_ids
+                ],
+                ignore_conflicts=True,
+            )
+
+            # The memberships that were inserted carry this change_seq
+            added_ids = set(
+                RoomMember.objects.filter(
+                    room_id=room_id,
+                    room_member__in=new_member_ids,
+                    change_seq=self.change_seq,
+                ).values_list("room_member_id", flat=True)
+            )
+            current_member_ids.update(set(new_member_ids) - added_ids)
+
+            # Members that are back are no longer removed
+            Tombstone.objects.filter(
+                room_id=room_id,
+                kind=Tombstone.MEMBER,
+                object_id__in=added_ids,
+            ).delete()
+
+            # bulk_create() sends no signals
+            Room.objects.touch([room_id])
+            room_list_cache.bump_user_rooms(added_ids)
 
-        # Assuming that 'new_members' is a list of dictionaries with 'value' and 'label' keys
-        for member_data in new_members:
-            user = User.objects.get(pk=member_data["value"])
-            RoomMember.objects.create(room=room, room_member=user)
+        # Report what happened to each invited user
+        self.results = []
+
+        for user_id in user_ids:
+            if user_id not in users:
+                result = "not_found"
+            elif user_id in current_member_ids:
+                result = "already_member"
+            else:
+                result = "added"
+
+            self.results.append({"user_id": user_id, "status": result})
 
         return room
+
+
+class RoomMembersDestroySerializer(serializers.Serializer):
+    members = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+    )
+
+
+class RoomChangesSerializer(serializers.Serializer):
+    """
+    The number of the room's change sequence a client synced the room up to.
+    """
+
+    since = serializers.IntegerField(min_value=0, default=0)
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Room, RoomMember
+from . import cache
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def room_changed(sender, instance, **kwargs):
+    cache.bump_rooms([instance.room_id])
+
+
+@receiver(post_save, sender=RoomMember)
+@receiver(post_delete, sender=RoomMember)
+def room_member_changed(sender, instance, **kwargs):
+    Room.objects.touch([instance.room_id])
+    cache.bump_user_rooms([instance.room_member_id])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    # Users are serialized as room admins and members of their rooms
+    if not created:
+        Room.objects.touch(
+            Room.objects.filter(
+                Q(room_admin=instance) | Q(roommember__room_member=instance)
+            )
+            .values_list("room_id", flat=True)
+            .distinct()
+        )
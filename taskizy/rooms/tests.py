@@ -1,3 +1,674 @@
-from django.test import TestCase
+import asyncio
+from asgiref.sync import async_to_sync, sync_to_async
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from taskizy.parsers import FastJSONParser
+from taskizy.renderers import FastJSONRenderer
+from tasks.models import Task
+from tasks.views import UserTasksListCreateView, AsyncUserTasksListView
+from users.views import InviteCandidatesListView, AsyncInviteCandidatesListView
+from .models import Room, RoomMember
+from . import cache as room_list_cache
+from . import events
+from .serializers import RoomSerializer, RoomsListSerializer
+from .views import (
+    AsyncRoomView,
+    AsyncRoomsListView,
+    RoomEventsView,
+    RoomView,
+    RoomsListCreateView,
+)
 
-# Create your tests here.
+
+User = get_user_model()
+
+
+class RoomMembersQueryBudgetTest(TestCase):
+    """
+    Room members are loaded with a fixed number of queries, no matter how
+    many rooms or members there are.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def create_rooms(self, room_count, member_count):
+        for room_index in range(room_count):
+            room = Room.objects.create(
+                room_name=f"Room {room_index}",
+                room_admin=self.user,
+            )
+            RoomMember.objects.create(room=room, room_member=self.user)
+
+            for member_index in range(member_count):
+                member = User.objects.create_user(
+                    "Room",
+                    "Member",
+                    f"member-{User.objects.count()}@taskizy.com",
+                    "password",
+                )
+                RoomMember.objects.create(room=room, room_member=member)
+
+    def test_rooms_list_query_count(self):
+        for room_count, member_count in [(1, 1), (5, 8)]:
+            with self.subTest(rooms=room_count, members=member_count):
+                Room.objects.all().delete()
+                self.create_rooms(room_count, member_count)
+                cache.clear()
+
+                # Room ids of the user, the rooms, and the members of all rooms
+                with self.assertNumQueries(3):
+                    response = self.client.get("/api/rooms/")
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data), room_count)
+
+                for room_data in response.data:
+                    self.assertEqual(
+                        len(room_data["room_members"]),
+                        member_count + 1,
+                    )
+
+    def test_room_serializer_query_count(self):
+        self.create_rooms(4, 6)
+        rooms = Room.objects.select_related("room_admin")
+
+        with self.assertNumQueries(2):
+            data = RoomSerializer(rooms.with_members(), many=True).data
+
+        self.assertEqual([len(room["room_members"]) for room in data], [7] * 4)
+
+    def test_members_without_prefetch(self):
+        self.create_rooms(1, 3)
+        room = Room.objects.get()
+
+        # The room admin and the members of the room
+        with self.assertNumQueries(2):
+            data = RoomsListSerializer(room).data
+
+        self.assertEqual(len(data["room_members"]), 4)
+
+
+class RoomListCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def get_rooms(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get("/api/rooms/")
+
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_unchanged_room_list_is_served_from_cache(self):
+        self.get_rooms()
+
+        with self.assertNumQueries(0):
+            data = self.get_rooms()
+
+        self.assertEqual(data[0]["room_name"], "Room")
+        self.assertEqual(
+            room_list_cache.get_stats(),
+            {"hits": 1, "misses": 1, "hit_ratio": 0.5},
+        )
+
+    def test_writes_invalidate_the_room_list(self):
+        self.get_rooms()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(description="Task", room=self.room)
+            Room.objects.adjust_task_counts(self.room.pk, tasks=1)
+
+        self.assertEqual(self.get_rooms()[0]["tasks_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            room = Room.objects.create(room_name="Other room", room_admin=self.user)
+            RoomMember.objects.create(room=room, room_member=self.user)
+
+        self.assertEqual(len(self.get_rooms()), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Renamed"
+            self.user.save()
+
+        self.assertEqual(self.get_rooms()[0]["room_admin"]["first_name"], "Renamed")
+        self.assertEqual(room_list_cache.get_stats()["hits"], 0)
+
+    def test_renamed_admins_that_are_not_members_invalidate_the_room(self):
+        admin = User.objects.create_user(
+            "Other", "Admin", "other-admin@taskizy.com", "password"
+        )
+        Room.objects.filter(pk=self.room.pk).update(room_admin=admin)
+        cache.clear()
+        updated_on = Room.objects.get(pk=self.room.pk).updated_on
+        self.get_rooms()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.first_name = "Renamed"
+            admin.save()
+
+        self.assertEqual(self.get_rooms()[0]["room_admin"]["first_name"], "Renamed")
+        self.assertGreater(Room.objects.get(pk=self.room.pk).updated_on, updated_on)
+
+
+class IsRoomMemberTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.outsider = User.objects.create_user(
+            "Room", "Outsider", "outsider@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.admin)
+        RoomMember.objects.create(room=self.room, room_member=self.admin)
+
+        self.client = APIClient()
+
+    def test_outsiders_get_not_found(self):
+        self.client.force_authenticate(self.outsider)
+
+        for url in [
+            f"/api/room/{self.room.pk}/{self.room.room_slug}/",
+            f"/api/room/{self.room.pk}/{self.room.room_slug}/members/",
+            f"/api/task/room/{self.room.pk}/bulk/",
+            f"/api/get-users/{self.room.pk}/",
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_room_and_membership_are_resolved_once(self):
+        self.client.force_authenticate(self.admin)
+
+        # The room with the membership, the room members, and the task count
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                f"/api/room/{self.room.pk}/{self.room.room_slug}/"
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+        # Unchanged rooms only need the room with the membership
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f"/api/room/{self.room.pk}/{self.room.room_slug}/",
+                HTTP_IF_NONE_MATCH=response["ETag"],
+            )
+
+        self.assertEqual(response.status_code, 304)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/room/{self.room.pk}/{self.room.room_slug}/"
+
+    def modify_room(self, updated_on):
+        Room.objects.filter(pk=self.room.pk).update(updated_on=updated_on)
+
+    def test_unchanged_rooms_are_not_modified(self):
+        self.modify_room(timezone.now() - timedelta(minutes=1))
+        response = self.client.get(self.url)
+
+        for headers in [
+            {"HTTP_IF_NONE_MATCH": response["ETag"]},
+            {"HTTP_IF_MODIFIED_SINCE": response["Last-Modified"]},
+        ]:
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get(self.url, **headers).status_code, 304)
+
+    def test_changed_rooms_are_sent_again(self):
+        self.modify_room(timezone.now() - timedelta(minutes=1))
+        response = self.client.get(self.url)
+        self.modify_room(timezone.now())
+
+        for headers in [
+            {"HTTP_IF_NONE_MATCH": response["ETag"]},
+            {"HTTP_IF_MODIFIED_SINCE": response["Last-Modified"]},
+        ]:
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get(self.url, **headers).status_code, 200)
+
+    def test_changes_within_the_same_second_are_sent_again(self):
+        now = timezone.now()
+        self.modify_room(now)
+
+        with mock.patch("taskizy.conditional.time", return_value=now.timestamp()):
+            response = self.client.get(self.url)
+            not_modified_since = self.client.get(
+                self.url, HTTP_IF_MODIFIED_SINCE=http_date(now.timestamp())
+            )
+
+        # The date could not tell a later change within this second apart
+        self.assertNotIn("Last-Modified", response)
+        self.assertEqual(not_modified_since.status_code, 200)
+
+
+class FastJSONTest(TestCase):
+    def test_room_payload_matches_json_renderer(self):
+        user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        room = Room.objects.create(room_name="Room", room_admin=user)
+        RoomMember.objects.create(room=room, room_member=user)
+        Task.objects.create(
+            description="Task \u2028 ünïcode", room=room, creator=user
+        )
+
+        client = APIClient()
+        client.force_authenticate(user)
+        data = client.get(f"/api/room/{room.pk}/{room.room_slug}/").data
+        data["extra"] = {
+            "created_on": room.room_created_on,
+            "label": gettext_lazy("Room"),
+            "amount": Decimal("1.50"),
+            1: None,
+        }
+
+        rendered = FastJSONRenderer().render(data)
+
+        self.assertEqual(rendered, JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO(rendered)),
+            JSONParser().parse(BytesIO(rendered)),
+        )
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+        User.objects.create_user("Invite", "Me", "invite@taskizy.com", "password")
+
+        for index in range(12):
+            Task.objects.create(
+                description=f"Task {index}",
+                tasker=self.user,
+                room=self.room,
+                is_completed=index % 2 == 0,
+            )
+
+        cache.clear()
+
+    def get(self, view, path, query, **kwargs):
+        request = APIRequestFactory().get(path, query)
+        force_authenticate(request, self.user)
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+
+        return view(request, **kwargs).render()
+
+    def test_async_views_match_sync_views(self):
+        room_kwargs = {"room_id": self.room.pk, "room_slug": self.room.room_slug}
+
+        for sync_view, async_view, kwargs, query in [
+            (RoomsListCreateView, AsyncRoomsListView, {}, {}),
+            (RoomView, AsyncRoomView, room_kwargs, {"page": 2}),
+            (RoomView, AsyncRoomView, room_kwargs, {"pagination": "cursor"}),
+            (UserTasksListCreateView, AsyncUserTasksListView, {"pk": self.user.pk}, {}),
+            (
+                InviteCandidatesListView,
+                AsyncInviteCandidatesListView,
+                {"room_id": self.room.pk},
+                {"search": "inv"},
+            ),
+        ]:
+            with self.subTest(view=sync_view.__name__, query=query):
+                expected = self.get(sync_view.as_view(), "/", query, **kwargs)
+                response = self.get(async_view.as_view(), "/", query, **kwargs)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+
+
+class RoomEventsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_events(self):
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, self.user)
+
+        return RoomEventsView.as_view()(
+            request, room_id=self.room.pk, room_slug=self.room.room_slug
+        )
+
+    def commit(self, method, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return method(*args, **kwargs)
+
+    def test_events_are_only_streamed_over_asgi(self):
+        response = self.get_events()
+
+        self.assertEqual(response.status_code, 501)
+
+    @override_settings(ASYNC_VIEWS=True)
+    async def test_committed_task_changes_are_streamed(self):
+        response = await sync_to_async(self.get_events)()
+        messages = aiter(response)
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(await anext(messages), events.KEEP_ALIVE_MESSAGE.encode())
+
+        created = await sync_to_async(self.commit)(
+            self.client.post,
+            f"/api/task/room/{self.room.pk}/create/",
+            {"description": "Task", "is_urgent": False, "tasker": self.user.pk},
+            format="json",
+        )
+
+        self.assertEqual(
+            (await anext(messages)).decode(),
+            events.encode(events.TASKS_CREATED, {"tasks": [created.data]}, 1),
+        )
+
+        await sync_to_async(self.commit)(
+            self.client.delete,
+            f"/api/task/room/{self.room.pk}/task/{created.data['task_id']}/delete/",
+        )
+
+        self.assertEqual(
+            (await anext(messages)).decode(),
+            events.encode(
+                events.TASK_DELETED, {"task_id": created.data["task_id"]}, 2
+            ),
+        )
+
+    @override_settings(
+        ASYNC_VIEWS=True, ROOM_EVENTS_KEEP_ALIVE=0.01, ROOM_EVENTS_MAX_AGE=0.05
+    )
+    async def test_streams_end_after_their_max_age(self):
+        response = await sync_to_async(self.get_events)()
+        messages = [message async for message in response]
+
+        self.assertGreater(len(messages), 2)
+        self.assertEqual(set(messages), {events.KEEP_ALIVE_MESSAGE.encode()})
+        self.assertEqual(events.get_broker().subscriptions, {})
+
+    async def test_lagging_clients_are_told_to_resync(self):
+        loop = asyncio.get_running_loop()
+        subscription = events.get_broker().subscribe(self.room.pk, loop)
+
+        with self.settings(ROOM_EVENTS_QUEUE_SIZE=1):
+            lagging = events.get_broker().subscribe(self.room.pk, loop)
+
+        for index in range(2):
+            events.get_broker().publish(self.room.pk, f"message {index}")
+
+        self.assertEqual(await subscription.get(1), "message 0")
+        self.assertTrue(lagging.overflowed)
+        self.assertFalse(subscription.overflowed)
+
+        subscription.close()
+
+
+class RoomMembersBulkDestroyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        self.members = [
+            User.objects.create_user(
+                "Room", "Member", f"member-{index}@taskizy.com", "password"
+            )
+            for index in range(3)
+        ]
+
+        for user in [self.user, *self.members]:
+            RoomMember.objects.create(room=self.room, room_member=user)
+            Task.objects.create(
+                description="Task", creator=self.user, tasker=user, room=self.room
+            )
+            Task.objects.create(
+                description="Task", creator=user, is_completed=True, room=self.room
+            )
+
+        Room.objects.filter(pk=self.room.pk).recount_tasks()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_members_are_removed_with_their_tasks_unassigned(self):
+        removed = self.members[:2]
+
+        # The change sequence and a single touch, whatever the number of
+        # removed members
+        with CaptureQueriesContext(connection) as queries:
+            response = self.remove(removed)
+
+        self.assertEqual(
+            sum('UPDATE "rooms_room"' in query["sql"] for query in queries), 2
+        )
+
+        self.assertEqual(
+            response.data,
+            {
+                "removed_members": 2,
+                "affected_tasks": 4,
+                "tasker_cleared": 2,
+                "creator_cleared": 2,
+            },
+        )
+        self.assertEqual(
+            set(
+                RoomMember.objects.filter(room=self.room).values_list(
+                    "room_member", flat=True
+                )
+            ),
+            {self.user.pk, self.members[2].pk},
+        )
+        self.assertFalse(
+            Task.objects.filter(
+                Q(tasker__in=removed) | Q(creator__in=removed)
+            ).exists()
+        )
+
+        # The tasks stay in the room, so its counters are unchanged
+        room = Room.objects.get(pk=self.room.pk)
+        self.assertEqual((room.task_count, room.completed_task_count), (8, 4))
+        self.assertEqual(Task.objects.filter(room=room).count(), room.task_count)
+        self.assertEqual(room.change_seq, 1)
+
+    def test_only_the_admin_removes_members(self):
+        self.client.force_authenticate(self.members[0])
+        response = self.remove([self.members[1]])
+
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(self.user)
+        response = self.remove([self.user, self.members[1]])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(RoomMember.objects.filter(room=self.room).count(), 4)
+
+    def test_users_that_are_not_members_change_nothing(self):
+        outsider = User.objects.create_user(
+            "Room", "Outsider", "outsider@taskizy.com", "password"
+        )
+        response = self.remove([outsider])
+
+        self.assertEqual(response.data["removed_members"], 0)
+        self.assertEqual(Room.objects.get(pk=self.room.pk).change_seq, 0)
+
+    def remove(self, users):
+        return self.client.post(
+            f"/api/room/{self.room.pk}/members/destroy/",
+            {"members": [user.pk for user in users]},
+            format="json",
+        )
+
+
+class RoomChangesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.member = User.objects.create_user(
+            "Room", "Member", "member@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+
+        for user in (self.user, self.member):
+            RoomMember.objects.create(room=self.room, room_member=user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/room/{self.room.pk}/{self.room.room_slug}/changes/"
+
+    def create_tasks(self, count):
+        return self.client.post(
+            f"/api/task/room/{self.room.pk}/create/",
+            [
+                {
+                    "description": f"Task {index}",
+                    "is_urgent": False,
+                    "tasker": self.user.pk,
+                }
+                for index in range(count)
+            ],
+            format="json",
+        ).data
+
+    def test_only_changes_since_the_cursor_are_returned(self):
+        _, deleted, updated = self.create_tasks(3)
+        since = self.client.get(self.url).data["change_seq"]
+
+        self.client.patch(
+            f"/api/task/room/{self.room.pk}/task/{updated['task_id']}/mark-done/",
+            {"is_completed": True},
+            format="json",
+        )
+        self.client.delete(
+            f"/api/task/room/{self.room.pk}/task/{deleted['task_id']}/delete/"
+        )
+        self.client.post(
+            f"/api/room/{self.room.pk}/members/destroy/",
+            {"members": [self.member.pk]},
+            format="json",
+        )
+
+        # The room with the membership, and one range scan per kind of change
+        with self.assertNumQueries(4):
+            changes = self.client.get(self.url, {"since": since}).data
+
+        self.assertEqual(changes["change_seq"], since + 3)
+        self.assertEqual(
+            [task["task_id"] for task in changes["tasks"]], [updated["task_id"]]
+        )
+        self.assertTrue(changes["tasks"][0]["is_completed"])
+        self.assertEqual(changes["deleted_tasks"], [deleted["task_id"]])
+        self.assertEqual(changes["members"], [])
+        self.assertEqual(changes["removed_members"], [self.member.pk])
+
+        # Synced clients only cost the room
+        with self.assertNumQueries(1):
+            changes = self.client.get(self.url, {"since": changes["change_seq"]}).data
+
+        self.assertEqual(changes["tasks"], [])
+
+
+class RoomMembersCreateTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.invitee = User.objects.create_user(
+            "Room", "Invitee", "invitee@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_members_are_added_to_the_room_of_the_url(self):
+        other_room = Room.objects.create(room_name="Other room")
+
+        response = self.client.post(
+            f"/api/room/{self.room.pk}/{self.room.room_slug}/members/",
+            {"room_id": other_room.pk, "new_members": [self.invitee.pk]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(
+            RoomMember.objects.filter(room=self.room, room_member=self.invitee).exists()
+        )
+        self.assertFalse(RoomMember.objects.filter(room=other_room).exists())
+
+    def test_new_rooms_sync_from_zero(self):
+        room = self.client.post("/api/rooms/", {"room_name": "New room"}).data
+        changes = self.client.get(
+            f"/api/room/{room['room_id']}/new-room/changes/", {"since": 0}
+        ).data
+
+        self.assertEqual(changes["change_seq"], 1)
+        self.assertEqual(
+            [member["room_member"]["id"] for member in changes["members"]],
+            [self.user.pk],
+        )
+
+    def test_members_added_concurrently_are_reported_as_members(self):
+        bulk_create = RoomMember.objects.bulk_create
+
+        # Another request adds the invitee between the read and the insert
+        def add_concurrently(memberships, **kwargs):
+            RoomMember.objects.create(room=self.room, room_member=self.invitee)
+            return bulk_create(memberships, **kwargs)
+
+        with mock.patch.object(RoomMember.objects, "bulk_create", add_concurrently):
+            response = self.client.post(
+                f"/api/room/{self.room.pk}/{self.room.room_slug}/members/",
+                {"new_members": [self.invitee.pk]},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            response.data["new_members"],
+            [{"user_id": self.invitee.pk, "status": "already_member"}],
+        )
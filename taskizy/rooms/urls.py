@@ -1,23 +1,45 @@
 from django.urls import path
+from taskizy.async_views import as_view
 from .views import (
     RoomsListCreateView,
+    AsyncRoomsListView,
+    RoomListCacheStatsView,
     RoomView,
+    AsyncRoomView,
+    RoomEventsView,
+    RoomChangesView,
     RoomMembersListCreateView,
     RoomAdminUpdateView,
     RoomMembersDestroyView,
+    RoomMembersBulkDestroyView,
 )
 
 urlpatterns = [
     path(
         "rooms/",
-        RoomsListCreateView.as_view(),
+        as_view(RoomsListCreateView, AsyncRoomsListView),
         name="rooms",
     ),
+    path(
+        "rooms/cache-stats/",
+        RoomListCacheStatsView.as_view(),
+        name="rooms-cache-stats",
+    ),
     path(
         "room/<int:room_id>/<slug:room_slug>/",
-        RoomView.as_view(),
+        as_view(RoomView, AsyncRoomView),
         name="room",
     ),
+    path(
+        "room/<int:room_id>/<slug:room_slug>/events/",
+        RoomEventsView.as_view(),
+        name="room-events",
+    ),
+    path(
+        "room/<int:room_id>/<slug:room_slug>/changes/",
+        RoomChangesView.as_view(),
+        name="room-changes",
+    ),
     path(
         "room/<int:room_id>/<slug:room_slug>/members/",
         RoomMembersListCreateView.as_view(),
@@ -33,4 +55,9 @@ urlpatterns = [
         RoomMembersDestroyView.as_view(),
         name="room-member-destroy",
     ),
+    path(
+        "room/<int:room_id>/members/destroy/",
+        RoomMembersBulkDestroyView.as_view(),
+        name="room-members-destroy",
+    ),
 ]
@@ -2,10 +2,16 @@
 Holds the views for rooms.
 
 - RoomsListCreateView
+- AsyncRoomsListView
+- RoomListCacheStatsView
 - RoomView
+- AsyncRoomView
+- RoomEventsView
+- RoomChangesView
 - RoomAdminUpdateView
 - RoomMembersCreateView
 - RoomMembersDestroyView
+- RoomMembersBulkDestroyView
 """
 
 from rest_framework.generics import (
@@ -14,19 +20,32 @@ from rest_framework.generics import (
     UpdateAPIView,
     RetrieveUpdateDestroyAPIView,
     DestroyAPIView,
+    GenericAPIView,
 )
 
 from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import status
-from django.core.paginator import Paginator
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from taskizy import conditional
+from taskizy.renderers import EventStreamRenderer
+from taskizy.async_views import AsyncAPIViewMixin
+from taskizy.pagination import TaskizyPagination, CursorPaginationOptInMixin
 from tasks.filters import TaskFilter
-from .models import Room, RoomMember
+from .models import Room, RoomMember, Tombstone
+from .permissions import IsRoomAdmin, IsRoomMember, get_room
+from . import cache as room_list_cache
+from . import events
 from tasks.models import Task
+from tasks.serializers import TasksListValuesSerializer
 from .serializers import *
 import json
 
@@ -54,99 +73,128 @@ class RoomsListCreateView(ListCreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def list(self, request):
-        user = request.user.id
-        user_room_memberships = RoomMember.objects.filter(
-            room_member=User.objects.get(pk=user)
+        return Response(self.get_room_list(request), status=status.HTTP_200_OK)
+
+    def get_room_list(self, request):
+        return room_list_cache.get_room_list(
+            request.user.id,
+            get_room_ids=lambda: RoomMember.objects.filter(
+                room_member=request.user.id
+            ).values_list("room_id", flat=True),
+            serialize_rooms=self.serialize_rooms,
         )
 
-        room_ids = [user_room.room_id for user_room in user_room_memberships]
-        queryset = self.get_queryset().filter(room_id__in=room_ids)
+    def serialize_rooms(self, room_ids):
+        # Rooms of the user, with their members
+        queryset = (
+            self.get_queryset()
+            .filter(room_id__in=room_ids)
+            .select_related("room_admin")
+            .with_members()
+        )
         serializer = RoomsListSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return serializer.data
 
 
-class RoomView(RetrieveUpdateDestroyAPIView):
+class AsyncRoomsListView(AsyncAPIViewMixin, RoomsListCreateView):
+    """
+    Async RoomsListCreateView.list, for the ASGI deployment.
+    """
+
+    async def get(self, request):
+        # Django's cache backends have no native async API, so the list is
+        # read, or built on a miss, in one thread hop instead of one per
+        # cache operation
+        data = await sync_to_async(self.get_room_list)(request)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class RoomListCacheStatsView(APIView):
+    """
+    View for the hit/miss counters of the room list cache, for tuning.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(room_list_cache.get_stats(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        room_list_cache.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RoomView(CursorPaginationOptInMixin, RetrieveUpdateDestroyAPIView):
     """
     View for getting the room data, update, and deleting it.
+
+    Tasks are paginated by page number, or by cursor with `?pagination=cursor`.
     """
 
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
-    permission_classes = (IsAuthenticated,)
-    pagination_class = PageNumberPagination
+    permission_classes = (IsAuthenticated, IsRoomMember)
+    pagination_class = TaskizyPagination
 
     filter_backends = [DjangoFilterBackend]  # Use DjangoFilterBackend for filtering
     filterset_class = TaskFilter  # Use the TaskFilter you defined
 
     def get_object(self):
-        room_id = int(self.kwargs.get("room_id"))
-
-        try:
-            queryset = self.get_queryset().filter(room_id=room_id)
-            instance = queryset.get()
-
-            return instance
-
-        except Room.DoesNotExist:
-            return None
-
-    def check_if_member(self, request):
-        room = self.get_object()
-        user = request.user
-
-        check_member = RoomMember.objects.filter(room=room, room_member=user).count()
-        return False if check_member == 0 else True
+        # Resolved, with the caller's membership, by IsRoomMember
+        return get_room(self.request, self.kwargs.get("room_id"))
 
     def retrieve(self, request, *args, **kwargs):
-        is_member = self.check_if_member(request)
+        instance = self.get_object()
 
-        if not is_member:
-            return Response(status=status.HTTP_404_NOT_FOUND)
+        # Answer unchanged rooms from their modification time alone
+        etag, last_modified = conditional.get_validators(request, instance.updated_on)
+        not_modified = conditional.get_not_modified_response(
+            request, etag, last_modified
+        )
 
-        instance = self.get_object()
+        if not_modified is not None:
+            return not_modified
 
-        if instance is None:
-            return Response(
-                data="Room does not exists.",
-                status=status.HTTP_404_NOT_FOUND,
-            )
+        room_data = self.serializer_class(instance, many=False).data
 
-        serializer = self.serializer_class(instance, many=False)
+        # Paginate the filtered tasks, the page also holds the total pages
+        page = self.paginate_tasks(self.get_tasks(instance))
 
+        return self.get_room_response(room_data, page, etag, last_modified)
+
+    def get_tasks(self, instance):
         # Get the filtered tasks using django-filter
         filtered_tasks = TaskFilter(
-            request.GET,
+            self.request.GET,
             queryset=Task.objects.filter(room=instance).order_by("-task_id"),
         ).qs
 
-        # Paginate the filtered tasks
-        paginator = Paginator(filtered_tasks, self.pagination_class.page_size)
-
-        # Calculate the total number of pages
-        total_pages = paginator.num_pages
+        return filtered_tasks.order_by("is_completed", "-task_id")
 
-        page = self.paginate_queryset(
-            filtered_tasks.order_by("is_completed", "-task_id")
+    def paginate_tasks(self, tasks):
+        # Rows are counted from the tasks, without the joins of their columns
+        return self.paginate_queryset(
+            TasksListValuesSerializer.values(tasks), count_queryset=tasks
         )
 
+    def get_room_response(self, room_data, page, etag, last_modified):
         tasks_serialized = (
-            [TasksListSerializer(task).data for task in page]
-            if page is not None
-            else []
+            TasksListValuesSerializer.serialize(page) if page is not None else []
         )
 
         response_data = {
-            "room_data": serializer.data,
+            "room_data": room_data,
             "tasks": tasks_serialized,
-            "total_pages": total_pages,
         }
 
-        return (
+        response = (
             self.get_paginated_response(response_data)
             if page is not None
             else Response(response_data, status=status.HTTP_200_OK)
         )
 
+        return conditional.set_validators(response, etag, last_modified)
+
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.serializer_class(
@@ -158,7 +206,11 @@ class RoomView(RetrieveUpdateDestroyAPIView):
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
-            instance.delete()
+            room_id = instance.room_id
+
+            with transaction.atomic():
+                instance.delete()
+                events.publish(room_id, events.ROOM_DELETED, {"room_id": room_id})
 
             return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -166,22 +218,137 @@ class RoomView(RetrieveUpdateDestroyAPIView):
             return Response(status=status.HTTP_404_NOT_FOUND)
 
 
+class AsyncRoomView(AsyncAPIViewMixin, RoomView):
+    """
+    Async RoomView.retrieve, for the ASGI deployment.
+
+    The page of tasks and its count are queried through the async ORM.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        # Resolved by IsRoomMember during the permission checks
+        instance = self.get_object()
+
+        etag, last_modified = conditional.get_validators(request, instance.updated_on)
+        not_modified = conditional.get_not_modified_response(
+            request, etag, last_modified
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        # The room members are prefetched, which has no async API
+        room_data = await sync_to_async(
+            lambda: self.serializer_class(instance, many=False).data
+        )()
+        tasks = self.get_tasks(instance)
+        page = await self.apaginate_queryset(
+            TasksListValuesSerializer.values(tasks), count_queryset=tasks
+        )
+
+        return self.get_room_response(room_data, page, etag, last_modified)
+
+
+class RoomEventsView(APIView):
+    """
+    View streaming the changes to a room as server-sent events, see
+    rooms/events.py.
+
+    Events of changes carry the room's change_seq as their id, so a client
+    that reconnects catches up from its Last-Event-ID with RoomChangesView.
+
+    Streams are only served under ASGI, with `ASYNC_VIEWS` on: under WSGI
+    each open stream would hold a worker for as long as the client stays
+    connected.
+    """
+
+    permission_classes = (IsAuthenticated, IsRoomMember)
+    renderer_classes = (EventStreamRenderer,)
+
+    def get(self, request, room_id, room_slug):
+        if not settings.ASYNC_VIEWS:
+            return Response(
+                {"detail": "Room events are only served over ASGI."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+
+        response = StreamingHttpResponse(
+            events.stream(room_id), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Keep reverse proxies like nginx from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+
+        return response
+
+
+class RoomChangesView(APIView):
+    """
+    View for what changed in a room since a number of its change sequence:
+    the tasks and members added or changed, and the tasks deleted and the
+    members removed.
+
+    Every kind of change is read with one range scan of its (room,
+    change_seq) index. Clients pass the `change_seq` of the response as
+    `?since=` on their next sync.
+    """
+
+    permission_classes = (IsAuthenticated, IsRoomMember)
+
+    def get(self, request, room_id, room_slug):
+        serializer = RoomChangesSerializer(data=request.query_params)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        since = serializer.validated_data["since"]
+
+        # Read before the changes, so changes that commit while they are read
+        # are sent again on the next sync instead of being skipped
+        room = get_room(request, room_id)
+        data = {
+            "change_seq": room.change_seq,
+            "tasks": [],
+            "deleted_tasks": [],
+            "members": [],
+            "removed_members": [],
+        }
+
+        if since >= room.change_seq:
+            return Response(data, status=status.HTTP_200_OK)
+
+        tasks = Task.objects.filter(room=room, change_seq__gt=since)
+        data["tasks"] = TasksListValuesSerializer.serialize(
+            TasksListValuesSerializer.values(tasks.order_by("change_seq"))
+        )
+
+        members = (
+            RoomMember.objects.filter(room=room, change_seq__gt=since)
+            .select_related("room_member")
+            .order_by("change_seq")
+        )
+        data["members"] = RoomMembersListSerializer(members, many=True).data
+
+        tombstones = Tombstone.objects.filter(
+            room=room, change_seq__gt=since
+        ).order_by("change_seq")
+
+        for kind, object_id in tombstones.values_list("kind", "object_id"):
+            if kind == Tombstone.TASK:
+                data["deleted_tasks"].append(object_id)
+            else:
+                data["removed_members"].append(object_id)
+
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class RoomAdminUpdateView(UpdateAPIView):
     queryset = Room.objects.all()
     serializer_class = RoomAdminUpdateSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, IsRoomMember)
 
     def get_object(self):
-        room_id = int(self.kwargs.get("room_id"))
-
-        try:
-            queryset = self.get_queryset().filter(room_id=room_id)
-            instance = queryset.get()
-
-            return instance
-
-        except Room.DoesNotExist:
-            raise Exception("Room does not exists.")
+        return get_room(self.request, self.kwargs.get("room_id"))
 
     def patch(self, request, *args, **kwargs):
         try:
@@ -193,7 +360,12 @@ class RoomAdminUpdateView(UpdateAPIView):
             )
 
             if serializer.is_valid():
-                serializer.save()
+                with transaction.atomic():
+                    serializer.save()
+                    events.publish(
+                        instance.room_id, events.ROOM_UPDATED, serializer.data
+                    )
+
                 return Response(
                     data={"message": "Room admin updated."},
                     status=status.HTTP_200_OK,
@@ -217,11 +389,13 @@ class RoomMembersListCreateView(ListCreateAPIView):
 
     queryset = RoomMember.objects.all()
     serializer_class = RoomMembersListSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, IsRoomMember)
 
     def list(self, request, room_id, room_slug):
         try:
-            queryset = RoomMember.objects.filter(room_id=int(room_id))
+            queryset = RoomMember.objects.filter(room_id=int(room_id)).select_related(
+                "room_member"
+            )
         except RoomMember.DoesNotExist:
             return Response(
                 data={message: "Room members does not exists."},
@@ -233,22 +407,22 @@ class RoomMembersListCreateView(ListCreateAPIView):
         return Response({"room_members": serializer.data}, status=status.HTTP_200_OK)
 
     def create(self, request, room_id, room_slug):
-        try:
-            queryset = Room.objects.get(room_id=int(room_id))
-        except Room.DoesNotExist:
-            return Response(
-                data={message: "Room Does Not Exist"}, status=status.HTTP_404_NOT_FOUND
-            )
-
         serializer = RoomMembersCreateSerializer(data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                # Members are only added to the room of the URL, any room_id
+                # in the body is ignored
+                room = serializer.save(room=get_room(request, room_id))
+                data = {
+                    "room_data": RoomSerializer(room).data,
+                    "new_members": serializer.results,
+                }
+                events.publish(
+                    room.room_id, events.MEMBERS_ADDED, data, serializer.change_seq
+                )
 
-            return Response(
-                data=RoomSerializer(queryset).data,
-                status=status.HTTP_201_CREATED,
-            )
+            return Response(data=data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -256,7 +430,7 @@ class RoomMembersListCreateView(ListCreateAPIView):
 class RoomMembersDestroyView(DestroyAPIView):
     queryset = RoomMember.objects.all()
     serializer_class = RoomMembersListSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, IsRoomMember)
 
     def get_object(self):
         room_id = int(self.kwargs.get("room_id"))
@@ -274,26 +448,117 @@ class RoomMembersDestroyView(DestroyAPIView):
 
     def destroy(self, request, *args, **kwargs):
         try:
-            # Get the object instance
-            instance = self.get_object()
+            with transaction.atomic():
+                change_seq = Room.objects.next_change_seq(self.kwargs["room_id"])
+
+                # Get the object instance
+                instance = self.get_object()
+
+                # Update the tasker to None
+                update_tasker = (
+                    Task.objects.filter(tasker=instance.room_member)
+                    .filter(room=instance.room)
+                    .update(
+                        tasker=None, updated_on=timezone.now(), change_seq=change_seq
+                    )
+                )
 
-            # Update the tasker to None
-            update_tasker = (
-                Task.objects.filter(tasker=instance.room_member)
-                .filter(room=instance.room)
-                .update(tasker=None)
-            )
+                # Update the creator to None
+                creator = (
+                    Task.objects.filter(creator=instance.room_member)
+                    .filter(room=instance.room)
+                    .update(
+                        creator=None, updated_on=timezone.now(), change_seq=change_seq
+                    )
+                )
 
-            # Update the creator to None
-            creator = (
-                Task.objects.filter(creator=instance.room_member)
-                .filter(room=instance.room)
-                .update(creator=None)
-            )
+                # Delete instance, the task counters are left unchanged
+                instance.delete()
+                Tombstone.bury(
+                    instance.room_id,
+                    Tombstone.MEMBER,
+                    [instance.room_member_id],
+                    change_seq,
+                )
+                events.publish(
+                    instance.room_id,
+                    events.MEMBERS_REMOVED,
+                    {"member_ids": [instance.room_member_id]},
+                    change_seq,
+                )
 
-            # Delete instance and return a 204 response
-            instance.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         except RoomMember.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
+
+
+class RoomMembersBulkDestroyView(GenericAPIView):
+    """
+    View for the room admin to remove many members of a room at once.
+    """
+
+    queryset = RoomMember.objects.all()
+    serializer_class = RoomMembersDestroySerializer
+    permission_classes = (IsAuthenticated, IsRoomMember, IsRoomAdmin)
+
+    def post(self, request, room_id):
+        serializer = self.get_serializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        room = get_room(request, room_id)
+
+        if room.room_admin_id in serializer.validated_data["members"]:
+            return Response(
+                {"members": ["The room admin can't be removed."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        members = self.get_queryset().filter(
+            room=room_id, room_member__in=serializer.validated_data["members"]
+        )
+        member_ids = list(members.values_list("room_member_id", flat=True))
+        data = {
+            "removed_members": 0,
+            "affected_tasks": 0,
+            "tasker_cleared": 0,
+            "creator_cleared": 0,
+        }
+
+        # Users that aren't members leave the room and its changes untouched
+        if not member_ids:
+            return Response(data=data, status=status.HTTP_200_OK)
+
+        room_tasks = Task.objects.filter(room=room_id)
+
+        with transaction.atomic():
+            change_seq = Room.objects.next_change_seq(room_id)
+            data["affected_tasks"] = room_tasks.filter(
+                Q(tasker__in=member_ids) | Q(creator__in=member_ids)
+            ).count()
+
+            # Clear the tasker and creator of their tasks, one UPDATE per column
+            data["tasker_cleared"] = room_tasks.filter(tasker__in=member_ids).update(
+                tasker=None, updated_on=timezone.now(), change_seq=change_seq
+            )
+            data["creator_cleared"] = room_tasks.filter(
+                creator__in=member_ids
+            ).update(creator=None, updated_on=timezone.now(), change_seq=change_seq)
+
+            # One DELETE without the post_delete signal of every membership,
+            # the room and the room lists of the users are invalidated once
+            data["removed_members"] = members._raw_delete(members.db)
+            Room.objects.touch([room_id])
+            room_list_cache.bump_user_rooms(member_ids)
+
+            Tombstone.bury(room_id, Tombstone.MEMBER, member_ids, change_seq)
+            events.publish(
+                room_id,
+                events.MEMBERS_REMOVED,
+                {"member_ids": member_ids},
+                change_seq,
+            )
+
+        return Response(data=data, status=status.HTTP_200_OK)
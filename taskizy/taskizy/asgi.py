@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskizy.settings')
 
+# Serve the read views with their async variants, see taskizy/async_views.py
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+
 application = get_asgi_application()
@@ -0,0 +1,76 @@
+"""
+HTTP validators for conditional GET requests.
+
+Read views derive an ETag and a Last-Modified date from the modification
+timestamp of what they serialize, and answer a matching If-None-Match or
+If-Modified-Since with a 304 before doing any of the serialization work.
+
+Last-Modified only has a precision of one second, so it is left out while
+the data was modified within the current second: a change later in that
+second would have the same date, and If-Modified-Since would miss it.
+"""
+
+from calendar import timegm
+from hashlib import md5
+from time import time
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def get_validators(request, last_modified, *variant):
+    """
+    Return the ETag and the Last-Modified timestamp of the response to the
+    request, when its data was last modified at `last_modified`. The
+    timestamp is None while it is the current second.
+
+    The ETag also covers the full URL, so every page and filter of a list
+    gets its own, and any `variant` values the data depends on.
+    """
+    timestamp = (
+        timegm(last_modified.utctimetuple()) if last_modified is not None else None
+    )
+
+    if timestamp is not None and timestamp >= int(time()):
+        timestamp = None
+    key = ":".join(
+        str(part)
+        for part in (
+            request.get_full_path(),
+            last_modified.isoformat() if last_modified is not None else "",
+            *variant,
+        )
+    )
+
+    digest = md5(key.encode(), usedforsecurity=False).hexdigest()
+
+    return quote_etag(digest), timestamp
+
+
+def get_not_modified_response(request, etag, last_modified):
+    """
+    Return a 304 (or 412) response when the request's validators match,
+    otherwise None.
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+
+    if response is not None:
+        set_validators(response, etag, last_modified)
+
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response.headers.setdefault("ETag", etag)
+
+    if last_modified is not None:
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+
+    # Responses differ per user
+    patch_vary_headers(response, ("Authorization",))
+
+    return response
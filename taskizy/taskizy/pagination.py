@@ -0,0 +1,275 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.db.models import Q
+
+
+class TaskizyPagination(PageNumberPagination):
+    """
+    Page number pagination that also returns the total number of pages.
+
+    The total is derived from the paginator's count, so a page costs a
+    single COUNT query. A `count_queryset` with the same rows, e.g. the
+    queryset that `.values()` rows with joins were taken from, is counted
+    instead of the paginated queryset.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None, count_queryset=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+
+        if count_queryset is not None:
+            paginator.count = count_queryset.count()
+
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
+
+    async def apaginate_queryset(
+        self, queryset, request, view=None, count_queryset=None
+    ):
+        """
+        `paginate_queryset` for async views, running the count and the page
+        queries through the async ORM.
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await (
+            queryset if count_queryset is None else count_queryset
+        ).acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        self.page.object_list = [item async for item in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "total_pages": self.page.paginator.num_pages,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+class InviteCandidatePagination(TaskizyPagination):
+    """
+    Pages of invite candidates, whose size the client may lower or raise up
+    to `max_page_size`.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    Keyset pagination for tasks ordered by ("is_completed", "-task_id").
+
+    Pages are fetched by seeking past the (is_completed, task_id) of the
+    last task of the previous page, so deep pages cost the same as the
+    first one, and tasks added or deleted between page loads don't shift
+    the pages. Completing a task moves it though: a task already listed
+    with the open tasks can be listed again with the completed ones, and a
+    task uncompleted while the completed ones are paged is skipped.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    # Pages are not counted, so `count_queryset` is accepted and unused
+    def paginate_queryset(self, queryset, request, view=None, count_queryset=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(
+        self, queryset, request, view=None, count_queryset=None
+    ):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([task async for task in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """
+        The tasks of the requested page, plus one to know if there is a
+        following page.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            is_completed, task_id, reverse = None, None, False
+        else:
+            is_completed, task_id, reverse = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by("-is_completed", "task_id")
+        else:
+            queryset = queryset.order_by("is_completed", "-task_id")
+
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self.seek_filter(is_completed, task_id, reverse)
+            )
+
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        reverse = self.cursor is not None and self.cursor[2]
+        self.page = results[: self.page_size]
+        has_following = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_position(self, task):
+        """
+        The (is_completed, task_id) of a task, or of a `.values()` row.
+        """
+        if isinstance(task, dict):
+            return task["is_completed"], task["task_id"]
+
+        return task.is_completed, task.task_id
+
+    def seek_filter(self, is_completed, task_id, reverse):
+        """
+        Tasks that come after the cursor position, in the given direction.
+        """
+        if reverse:
+            return Q(is_completed=is_completed, task_id__gt=task_id) | Q(
+                is_completed__lt=is_completed
+            )
+
+        return Q(is_completed=is_completed, task_id__lt=task_id) | Q(
+            is_completed__gt=is_completed
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(*self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+
+        return self.encode_cursor(*self.get_position(self.page[0]), True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+
+        if not encoded:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+
+            is_completed = bool(int(tokens["c"][0]))
+            task_id = int(tokens["t"][0])
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return is_completed, task_id, reverse
+
+    def encode_cursor(self, is_completed, task_id, reverse):
+        tokens = {"c": int(is_completed), "t": task_id}
+
+        if reverse:
+            tokens["r"] = 1
+
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+class CursorPaginationOptInMixin:
+    """
+    View mixin that switches to `cursor_pagination_class` when the request
+    asks for it with `?pagination=cursor`.
+    """
+
+    cursor_pagination_class = TaskCursorPagination
+    pagination_mode_query_param = "pagination"
+
+    def paginate_queryset(self, queryset, count_queryset=None):
+        if self.paginator is None:
+            return None
+
+        return self.paginator.paginate_queryset(
+            queryset, self.request, view=self, count_queryset=count_queryset
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            mode = self.request.query_params.get(self.pagination_mode_query_param)
+
+            if mode == "cursor":
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+
+        return self._paginator
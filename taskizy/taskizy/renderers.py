@@ -0,0 +1,57 @@
+"""
+JSON renderer backed by orjson, when it is installed.
+
+Types orjson doesn't encode natively, like lazy translation strings,
+`Decimal` and query sets, and also datetimes, go through DRF's own
+`JSONEncoder`, so the output matches `JSONRenderer` byte for byte. Without
+orjson, or for indented output, rendering falls back to `JSONRenderer`.
+
+`EventStreamRenderer` lets event stream views negotiate
+`text/event-stream`, and renders what isn't streamed as an error event.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+
+        # Escape U+2028 and U+2029 like JSONRenderer, so the output stays a
+        # strict javascript subset
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class EventStreamRenderer(FastJSONRenderer):
+    """
+    Render a response that isn't a stream, e.g. an authentication error, as
+    one `error` server-sent event.
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        data = super().render(data, accepted_media_type, renderer_context)
+        return b"event: error\ndata: " + (data or b"null") + b"\n\n"
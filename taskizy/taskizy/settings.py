@@ -39,7 +39,10 @@ CSRF_TRUSTED_ORIGINS = [
 
 # Email Setup
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Emails are queued, and sent through EMAIL_OUTBOX_BACKEND by the
+# send_queued_email command
+EMAIL_BACKEND = "users.mail.OutboxEmailBackend"
+EMAIL_OUTBOX_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_USE_SSL = True
 EMAIL_USE_TLS = False
 EMAIL_HOST = os.environ["EMAIL_HOST"]
@@ -47,6 +50,15 @@ EMAIL_HOST_USER = os.environ["EMAIL_HOST_USER"]
 EMAIL_HOST_PASSWORD = os.environ["EMAIL_HOST_PASSWORD"]
 DEFAULT_FROM_EMAIL = os.environ["DEFAULT_FROM_EMAIL"]
 EMAIL_PORT = os.environ["EMAIL_PORT"]
+
+# Attempts at sending a queued email, the delay before the first retry,
+# doubled on each retry up to the maximum, and the seconds a worker has to
+# send the emails it took
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60
+EMAIL_OUTBOX_LEASE = 5 * 60
+
 DOMAIN = os.environ["DOMAIN"]
 SITE_NAME = os.environ["SITE_NAME"]
 
@@ -123,6 +135,35 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "taskizy"),
+    }
+}
+
+# Serve the read views with their async variants, turned on by taskizy/asgi.py
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "False") == "True"
+
+# Cache used for the room list of each user, and how long a list is kept
+ROOM_LIST_CACHE_ALIAS = "default"
+ROOM_LIST_CACHE_TIMEOUT = 60 * 60
+
+# Broker of the room event streams, the seconds between keep-alive comments
+# of an idle stream, the seconds a stream lasts before the client has to
+# reconnect, and the unread events a client may fall behind by before it is
+# told to re-fetch the room
+ROOM_EVENTS_BROKER = "rooms.events.InMemoryBroker"
+ROOM_EVENTS_KEEP_ALIVE = 15
+ROOM_EVENTS_MAX_AGE = 300
+ROOM_EVENTS_QUEUE_SIZE = 100
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -178,12 +219,23 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    # orjson backed JSON, which falls back to DRF's JSONRenderer and
+    # JSONParser when orjson isn't installed. List those to always use them.
+    "DEFAULT_RENDERER_CLASSES": [
+        "taskizy.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "taskizy.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_PAGINATION_CLASS": "taskizy.pagination.TaskizyPagination",
     "PAGE_SIZE": 10,
 }
 
@@ -194,8 +246,21 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_OBTAIN_SERIALIZER": "users.serializers.MyTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.CachedTokenRefreshSerializer",
 }
 
+# Refresh token blacklist lookups kept in memory by each process, and how
+# long, in seconds, a token found not blacklisted is trusted without a lookup
+TOKEN_BLACKLIST_CACHE_SIZE = 10000
+TOKEN_BLACKLIST_CACHE_TIMEOUT = 30
+
+# Cache of the claims version of each user, and how long, in seconds, a
+# cached version is trusted. With a cache of each process, like the default
+# local-memory one, this bounds how long other processes trust the tokens
+# of a user who was changed, deactivated or deleted
+CLAIMS_VERSION_CACHE_ALIAS = "default"
+CLAIMS_VERSION_CACHE_TIMEOUT = 30
+
 
 # Djoser settings
 DJOSER = {
@@ -211,11 +276,22 @@ DJOSER = {
     "TOKEN_MODEL": None,
     "SERIALIZERS": {
         "user_create": "users.serializers.CreateUserSerializer",
+        "user_create_password_retype": (
+            "users.serializers.CreateUserPasswordRetypeSerializer"
+        ),
         "user": "users.serializers.UserSerializer",
         "user_delete": "djoser.serializers.UserDeleteSerializer",
     },
 }
 
+# Profile images are downscaled to fit a square of USER_IMAGE_SIZE pixels,
+# and stored by the upload_user_images command
+USER_IMAGE_SIZE = 256
+USER_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+USER_IMAGE_MAX_PIXELS = 50_000_000
+USER_IMAGE_MAX_ATTEMPTS = 5
+USER_IMAGE_RETRY_DELAY = 60
+
 # Cloudinary settings
 CLOUDINARY_URL = os.environ["CLOUDINARY_URL"]
 CLOUDINARY_STORAGE = {
@@ -0,0 +1,180 @@
+"""
+Read-only serializers that work from `.values()` rows.
+
+A `ValuesSerializer` reproduces the output of a DRF serializer without
+model instances or per-row field binding. The fields of the DRF serializer
+are introspected once per class, on first use, into the columns to fetch
+and one getter per field, so serializing a row is a single pass over
+plain dictionaries.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+def get_column(field, prefix):
+    if field.source == "*":
+        raise ImproperlyConfigured(
+            f"Field {field.field_name!r} with source='*' can't be read from rows."
+        )
+
+    return prefix + "__".join(field.source_attrs)
+
+
+def compile_column(column):
+    def get_value(row):
+        return row[column]
+
+    return get_value
+
+
+def compile_field(field, column):
+    to_representation = field.to_representation
+
+    def get_value(row):
+        value = row[column]
+        return None if value is None else to_representation(value)
+
+    return get_value
+
+
+def compile_file_field(field, column, model):
+    model_field = model._meta.get_field(field.source_attrs[-1])
+
+    # File fields rendered from another column, like a cached URL
+    if not isinstance(model_field, models.FileField):
+        return compile_field(field, column)
+
+    # Rows are serialized without a request, so URLs stay relative as they
+    # do for DRF serializers without one in their context
+    if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+        return compile_field(serializers.CharField(), column)
+
+    storage = model_field.storage
+
+    def get_value(row):
+        name = row[column]
+        return storage.url(name) if name else None
+
+    return get_value
+
+
+def compile_nested(serializer, column):
+    columns, getters = compile_serializer(serializer, prefix=f"{column}__")
+
+    def get_value(row):
+        if row[column] is None:
+            return None
+        return {name: get_value(row) for name, get_value in getters}
+
+    return [column, *columns], get_value
+
+
+def compile_serializer(serializer, column_fields=None, prefix=""):
+    """
+    Return the columns to fetch for the serializer and a `(name, getter)`
+    pair per field, where the getter returns the value of the field from a
+    row of those columns.
+
+    `column_fields` maps fields that can't be derived from their type, e.g.
+    method fields, to the column holding their value.
+    """
+    column_fields = column_fields or {}
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    columns = []
+    getters = []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        if name in column_fields:
+            column = prefix + column_fields[name]
+            columns.append(column)
+            getters.append((name, compile_column(column)))
+            continue
+
+        column = get_column(field, prefix)
+
+        if isinstance(field, serializers.BaseSerializer) and not isinstance(
+            field, serializers.ListSerializer
+        ):
+            field_columns, get_value = compile_nested(field, column)
+            columns += field_columns
+        elif isinstance(field, serializers.PrimaryKeyRelatedField) and (
+            field.pk_field is None
+        ):
+            columns.append(column)
+            get_value = compile_column(column)
+        elif isinstance(field, serializers.FileField):
+            columns.append(column)
+            get_value = compile_file_field(field, column, model)
+        elif isinstance(
+            field,
+            (
+                serializers.RelatedField,
+                serializers.ManyRelatedField,
+                serializers.ListSerializer,
+                serializers.SerializerMethodField,
+            ),
+        ):
+            raise ImproperlyConfigured(
+                f"Field {name!r} of {type(serializer).__name__} needs a column "
+                "in `column_fields`."
+            )
+        else:
+            columns.append(column)
+            get_value = compile_field(field, column)
+
+        getters.append((name, get_value))
+
+    return columns, getters
+
+
+class ValuesSerializer:
+    """
+    Serialize `.values()` rows exactly as `serializer_class` serializes
+    model instances.
+
+        rows = TasksListValuesSerializer.values(queryset)
+        data = TasksListValuesSerializer.serialize(rows)
+
+    The joins of related columns don't change the number of rows, so pages
+    of rows are counted from the queryset without them, passed to the
+    paginator as `count_queryset`.
+    """
+
+    serializer_class = None
+    column_fields = {}
+
+    @classmethod
+    def get_compiled(cls):
+        compiled = cls.__dict__.get("_compiled")
+
+        if compiled is None:
+            compiled = compile_serializer(cls.serializer_class(), cls.column_fields)
+            cls._compiled = compiled
+
+        return compiled
+
+    @classmethod
+    def get_field_names(cls):
+        _, getters = cls.get_compiled()
+        return [name for name, _ in getters]
+
+    @classmethod
+    def values(cls, queryset):
+        columns, _ = cls.get_compiled()
+        return queryset.values(*dict.fromkeys(columns))
+
+    @classmethod
+    def to_representation(cls, row):
+        _, getters = cls.get_compiled()
+        return {name: get_value(row) for name, get_value in getters}
+
+    @classmethod
+    def serialize(cls, rows):
+        _, getters = cls.get_compiled()
+        return [{name: get_value(row) for name, get_value in getters} for row in rows]
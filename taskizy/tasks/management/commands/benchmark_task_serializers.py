@@ -0,0 +1,102 @@
+"""
+Compare TasksListSerializer with TasksListValuesSerializer per 1,000 rows.
+
+The tasks are created inside a transaction that is rolled back, so the
+command can run against any database, e.g.
+
+    python manage.py benchmark_task_serializers --rows 5000 --repeat 20
+"""
+
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rooms.models import Room
+from tasks.models import Task
+from tasks.serializers import TasksListSerializer, TasksListValuesSerializer
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark the task list serializers per 1,000 rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tasks = self.seed(options["rows"])
+            self.report(tasks, options["rows"], options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, rows):
+        users = User.objects.bulk_create(
+            User(
+                first_name="Benchmark",
+                last_name=f"User {index}",
+                email=f"benchmark-{index}@bench.taskizy.com",
+                password="!",
+            )
+            for index in range(10)
+        )
+        room = Room.objects.create(room_name="Benchmark room", room_admin=users[0])
+        Task.objects.bulk_create(
+            (
+                Task(
+                    description=f"Benchmark task {index}",
+                    is_urgent=index % 5 == 0,
+                    is_completed=index % 3 == 0,
+                    creator=users[0],
+                    tasker=users[index % len(users)] if index % 7 else None,
+                    room=room,
+                )
+                for index in range(rows)
+            ),
+            batch_size=1000,
+        )
+
+        return Task.objects.filter(room=room).order_by("is_completed", "-task_id")
+
+    def report(self, tasks, rows, repeat):
+        instances = list(tasks.for_listing())
+        values = list(TasksListValuesSerializer.values(tasks))
+
+        renderer = JSONRenderer()
+        if renderer.render(TasksListValuesSerializer.serialize(values)) != (
+            renderer.render(TasksListSerializer(instances, many=True).data)
+        ):
+            raise CommandError("The serializers returned different output.")
+
+        benchmarks = {
+            "TasksListSerializer, serialize": lambda: TasksListSerializer(
+                instances, many=True
+            ).data,
+            "TasksListValuesSerializer, serialize": lambda: (
+                TasksListValuesSerializer.serialize(values)
+            ),
+            "TasksListSerializer, query and serialize": lambda: TasksListSerializer(
+                tasks.for_listing(), many=True
+            ).data,
+            "TasksListValuesSerializer, query and serialize": lambda: (
+                TasksListValuesSerializer.serialize(
+                    TasksListValuesSerializer.values(tasks)
+                )
+            ),
+        }
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{rows} rows, {repeat} runs"))
+
+        for name, run in benchmarks.items():
+            start = perf_counter()
+            for _ in range(repeat):
+                run()
+            elapsed = (perf_counter() - start) / repeat / rows * 1000 * 1000
+
+            self.stdout.write(
+                self.style.MIGRATE_LABEL(f"  {name}: {elapsed:.3f} ms per 1,000 rows")
+            )
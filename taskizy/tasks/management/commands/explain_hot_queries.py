@@ -0,0 +1,173 @@
+"""
+Seed a large dataset and compare the query plans and timings of the hot
+task and membership lookups with and without their composite indexes.
+
+The indexes are dropped and recreated, so the command only runs with
+`DEBUG` on or with `--yes`, and everything runs in one transaction that is
+rolled back, which removes the seeded data and undoes the index changes,
+e.g.
+
+    python manage.py explain_hot_queries --rooms 200 --tasks-per-room 500 --yes
+"""
+
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rooms.models import Room, RoomMember
+from tasks.models import Task
+
+
+User = get_user_model()
+
+SEED_EMAIL_DOMAIN = "seed.taskizy.com"
+
+
+class Command(BaseCommand):
+    help = "Show query plans and timings of hot queries with and without indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=100)
+        parser.add_argument("--members-per-room", type=int, default=10)
+        parser.add_argument("--tasks-per-room", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument(
+            "--yes",
+            action="store_true",
+            help="Run with DEBUG off, the changes are rolled back either way.",
+        )
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG or options["yes"]):
+            raise CommandError(
+                "This command drops and recreates indexes of the database, run "
+                "it with DEBUG on or pass --yes."
+            )
+
+        if not connection.features.can_rollback_ddl:
+            raise CommandError(
+                "The index changes of this database can't be rolled back."
+            )
+
+        # SQLite only changes its schema with foreign key checks disabled,
+        # which can't be done within the transaction
+        with connection.constraint_checks_disabled(), transaction.atomic():
+            room, member = self.seed(
+                options["rooms"],
+                options["members_per_room"],
+                options["tasks_per_room"],
+            )
+            queries = self.hot_queries(room, member)
+
+            self.drop_indexes()
+            self.report("Without composite indexes", queries, options["repeat"])
+
+            self.create_indexes()
+            self.report("With composite indexes", queries, options["repeat"])
+
+            transaction.set_rollback(True)
+
+        self.stdout.write("Rolled back the seeded data and the index changes.")
+
+    def seed(self, room_count, members_per_room, tasks_per_room):
+        """
+        Seed the rooms with their members and tasks, and return the last room
+        with one of its members.
+        """
+        offset = User.objects.filter(email__endswith=SEED_EMAIL_DOMAIN).count()
+        users = User.objects.bulk_create(
+            User(
+                first_name="Seed",
+                last_name=f"User {offset + index}",
+                email=f"user-{offset + index}@{SEED_EMAIL_DOMAIN}",
+                password="!",
+            )
+            for index in range(room_count * members_per_room)
+        )
+
+        rooms = Room.objects.bulk_create(
+            Room(
+                room_name=f"Seed room {index}",
+                room_slug=f"seed-room-{index}",
+                room_admin=users[index * members_per_room],
+            )
+            for index in range(room_count)
+        )
+
+        members = []
+        tasks = []
+
+        for room_index, room in enumerate(rooms):
+            room_users = users[
+                room_index * members_per_room : (room_index + 1) * members_per_room
+            ]
+            members += [RoomMember(room=room, room_member=user) for user in room_users]
+            tasks += [
+                Task(
+                    description=f"Seed task {index}",
+                    is_completed=index % 3 == 0,
+                    creator=room_users[0],
+                    tasker=room_users[index % members_per_room],
+                    room=room,
+                )
+                for index in range(tasks_per_room)
+            ]
+
+        RoomMember.objects.bulk_create(members, batch_size=1000)
+        Task.objects.bulk_create(tasks, batch_size=1000)
+
+        self.stdout.write(
+            f"Seeded {len(users)} users, {len(rooms)} rooms and {len(tasks)} tasks."
+        )
+
+        return rooms[-1], users[-1]
+
+    def hot_queries(self, room, member):
+        ordering = ("is_completed", "-task_id")
+
+        return {
+            "Tasks of a room": lambda: Task.objects.filter(room=room).order_by(
+                *ordering
+            )[:10],
+            "Open tasks of a room": lambda: Task.objects.filter(
+                room=room, is_completed=False
+            ).order_by(*ordering)[:10],
+            "Open tasks of a tasker": lambda: Task.objects.filter(
+                tasker=member, is_completed=False
+            ).order_by(*ordering)[:10],
+            "Room membership check": lambda: RoomMember.objects.filter(
+                room=room, room_member=member
+            ),
+        }
+
+    def report(self, title, queries, repeat):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+
+        for name, get_queryset in queries.items():
+            start = perf_counter()
+            for _ in range(repeat):
+                list(get_queryset())
+            elapsed = (perf_counter() - start) / repeat * 1000
+
+            self.stdout.write(self.style.MIGRATE_LABEL(f"  {name}: {elapsed:.3f} ms"))
+            for line in get_queryset().explain().splitlines():
+                self.stdout.write(f"    {line}")
+
+    def drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for index in Task._meta.indexes:
+                editor.remove_index(Task, index)
+            for constraint in RoomMember._meta.constraints:
+                editor.remove_constraint(RoomMember, constraint)
+
+    def create_indexes(self):
+        with connection.schema_editor() as editor:
+            for index in Task._meta.indexes:
+                editor.add_index(Task, index)
+            for constraint in RoomMember._meta.constraints:
+                editor.add_constraint(RoomMember, constraint)
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['room', 'is_completed', '-task_id'], name='task_room_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['tasker', 'is_completed', '-task_id'], name='task_tasker_completed_idx'),
+        ),
+    ]
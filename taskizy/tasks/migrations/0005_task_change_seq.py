@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+def stamp_tasks(apps, schema_editor):
+    # Existing tasks are the first change of their room, see rooms 0006
+    apps.get_model("tasks", "Task").objects.update(change_seq=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0006_room_change_seq_tombstone'),
+        ('tasks', '0004_task_updated_on'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, verbose_name='change_seq'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['room', 'change_seq'], name='task_room_change_seq_idx'),
+        ),
+        migrations.RunPython(stamp_tasks, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,14 @@ from rooms.models import Room
 User = get_user_model()
 
 
+class TaskQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Join the room, creator and tasker that are serialized with each task.
+        """
+        return self.select_related("room", "creator", "tasker")
+
+
 class Task(models.Model):
     task_id = models.BigAutoField(
         _("task_ID"),
@@ -54,3 +62,30 @@ class Task(models.Model):
         null=True,
         blank=False,
     )
+    updated_on = models.DateTimeField(
+        _("updated_on"),
+        auto_now=True,
+    )
+    # Number of the last change of the room that changed the task
+    change_seq = models.BigIntegerField(_("change_seq"), default=0)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Tasks of a room, ordered as they are listed
+            models.Index(
+                fields=["room", "is_completed", "-task_id"],
+                name="task_room_completed_idx",
+            ),
+            # Tasks of a tasker, ordered as they are listed
+            models.Index(
+                fields=["tasker", "is_completed", "-task_id"],
+                name="task_tasker_completed_idx",
+            ),
+            # Tasks of a room changed since a number of its change sequence
+            models.Index(
+                fields=["room", "change_seq"],
+                name="task_room_change_seq_idx",
+            ),
+        ]
@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from taskizy.values_serializers import ValuesSerializer
 from django.contrib.auth import get_user_model
 from users.serializers import UserSerializer
 from .models import Task
-from rooms.models import Room
+from .filters import TaskFilter
+from rooms.models import Room, RoomMember
 
 User = get_user_model()
 
@@ -29,13 +31,118 @@ class TasksListSerializer(serializers.ModelSerializer):
         ]
 
     def get_room_slug(self, obj):
-        return Room.objects.get(room_id=obj.room_id).room_slug
+        return obj.room.room_slug if obj.room is not None else None
+
+
+class TasksListValuesSerializer(ValuesSerializer):
+    """
+    `TasksListSerializer` for `.values()` rows, used by the task lists.
+    """
+
+    serializer_class = TasksListSerializer
+    column_fields = {
+        # The room is rendered by its __str__, which is its name
+        "room": "room__room_name",
+        "room_slug": "room__room_slug",
+    }
+
+
+def get_tasker_errors(room_id, taskers):
+    """
+    The errors of each tasker, an empty list for members of the room, with
+    the membership of all of them checked in one query.
+    """
+    tasker_ids = []
+
+    for tasker in taskers:
+        try:
+            tasker_ids.append(int(tasker))
+        except ValueError:
+            tasker_ids.append(None)
+
+    member_ids = set(
+        RoomMember.objects.filter(
+            room_id=int(room_id),
+            room_member__in={tasker_id for tasker_id in tasker_ids} - {None},
+        ).values_list("room_member_id", flat=True)
+    )
+
+    return [
+        [] if tasker_id in member_ids else ["Tasker is not a member of the room."]
+        for tasker_id in tasker_ids
+    ]
+
+
+class TaskBulkCreateSerializer(serializers.ListSerializer):
+    """
+    Create many tasks of a room with one membership query and one insert.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", 500)
+        kwargs.setdefault("allow_empty", False)
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+
+        # Every tasker must be a member of the room, checked in one query
+        errors = [
+            {"tasker": tasker_errors} if tasker_errors else {}
+            for tasker_errors in get_tasker_errors(
+                self.context["room_id"], [item["tasker"] for item in attrs]
+            )
+        ]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+    def create(self, validated_data):
+        creator_id = int(self.context["request"].user.id)
+        room_id = int(self.context["room_id"])
+
+        tasks = Task.objects.bulk_create(
+            [
+                Task(
+                    description=item["description"],
+                    is_urgent=item["is_urgent"],
+                    creator_id=creator_id,
+                    tasker_id=int(item["tasker"]),
+                    room_id=room_id,
+                    change_seq=item.get("change_seq", 0),
+                )
+                for item in validated_data
+            ]
+        )
+
+        # Load the created tasks with what they are serialized with
+        return list(
+            Task.objects.for_listing()
+            .filter(pk__in=[task.pk for task in tasks])
+            .order_by("task_id")
+        )
 
 
 class TaskCreateSerializer(serializers.Serializer):
     description = serializers.CharField()
     tasker = serializers.CharField()
-    is_urgent = serializers.CharField()
+    # Accepts "on" from checkboxes as well as JSON booleans
+    is_urgent = serializers.BooleanField()
+
+    class Meta:
+        list_serializer_class = TaskBulkCreateSerializer
+
+    def validate_tasker(self, value):
+        # Taskers of a batch are checked together by TaskBulkCreateSerializer
+        if self.parent is None:
+            (errors,) = get_tasker_errors(self.context["room_id"], [value])
+
+            if errors:
+                raise serializers.ValidationError(errors)
+
+        return value
 
     def create(self, validated_data):
         try:
@@ -57,10 +164,79 @@ class TaskCreateSerializer(serializers.Serializer):
 
         task = Task.objects.create(
             description=description,
-            is_urgent=True if is_urgent == "on" else False,
+            is_urgent=is_urgent,
             creator=creator,
             tasker=tasker,
             room=room,
+            change_seq=validated_data.get("change_seq", 0),
         )
 
         return task
+
+
+class TaskBulkMutationSerializer(serializers.Serializer):
+    """
+    Selects tasks of a room by ID or by `TaskFilter` criteria, and the change
+    to apply to all of them.
+    """
+
+    ACTIONS = ["complete", "uncomplete", "reassign", "delete"]
+
+    action = serializers.ChoiceField(choices=ACTIONS)
+    task_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        allow_empty=False,
+    )
+    filter = serializers.DictField(required=False, allow_empty=False)
+    tasker = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        room_id = int(self.context["room_id"])
+
+        if ("task_ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError(
+                "Select the tasks with either task_ids or filter."
+            )
+
+        if "filter" in attrs:
+            # django-filter ignores unknown keys, which would select every task
+            unknown = sorted(set(attrs["filter"]) - set(TaskFilter.base_filters))
+
+            if unknown:
+                raise serializers.ValidationError(
+                    {"filter": [f"Unknown filter: {', '.join(unknown)}."]}
+                )
+
+            task_filter = TaskFilter(attrs["filter"], queryset=Task.objects.none())
+
+            if not task_filter.is_valid():
+                raise serializers.ValidationError({"filter": task_filter.errors})
+
+        if attrs["action"] == "reassign":
+            tasker_id = attrs.get("tasker")
+
+            if tasker_id is None:
+                raise serializers.ValidationError(
+                    {"tasker": ["This field is required to reassign tasks."]}
+                )
+
+            if not RoomMember.objects.filter(
+                room_id=room_id, room_member=tasker_id
+            ).exists():
+                raise serializers.ValidationError(
+                    {"tasker": ["Tasker is not a member of the room."]}
+                )
+
+        return attrs
+
+    def get_tasks(self):
+        """
+        The selected tasks of the room.
+        """
+        tasks = Task.objects.filter(room=int(self.context["room_id"]))
+
+        if "task_ids" in self.validated_data:
+            return tasks.filter(task_id__in=self.validated_data["task_ids"])
+
+        return TaskFilter(self.validated_data["filter"], queryset=tasks).qs
@@ -1,3 +1,435 @@
+import csv
+import json
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from taskizy.pagination import TaskizyPagination
+from rooms.models import Room, RoomMember
+from .models import Task
+from .serializers import TasksListSerializer, TasksListValuesSerializer
 
-# Create your tests here.
+
+User = get_user_model()
+
+
+class TasksListValuesSerializerTest(TestCase):
+    def test_output_matches_tasks_list_serializer(self):
+        creator = User.objects.create_user(
+            "Task", "Creator", "creator@taskizy.com", "password"
+        )
+        tasker = User.objects.create_user(
+            "Task", "Tasker", "tasker@taskizy.com", "password", role=None
+        )
+        tasker.user_image.name = "profile_images/tasker.png"
+        tasker.save()
+        room = Room.objects.create(room_name="Room", room_admin=creator)
+
+        Task.objects.create(
+            description="Task", is_urgent=True, creator=creator, room=room
+        )
+        Task.objects.create(
+            description="Other task", is_completed=True, tasker=tasker, room=room
+        )
+        Task.objects.create(description="Roomless task")
+
+        tasks = Task.objects.order_by("task_id")
+        renderer = JSONRenderer()
+
+        self.assertEqual(
+            renderer.render(
+                TasksListValuesSerializer.serialize(
+                    TasksListValuesSerializer.values(tasks)
+                )
+            ),
+            renderer.render(TasksListSerializer(tasks.for_listing(), many=True).data),
+        )
+
+    def test_pages_are_counted_without_the_joins(self):
+        tasks = Task.objects.order_by("task_id")
+        rows = TasksListValuesSerializer.values(tasks)
+        request = Request(APIRequestFactory().get("/"))
+
+        with CaptureQueriesContext(connection) as queries:
+            TaskizyPagination().paginate_queryset(rows, request, count_queryset=tasks)
+
+        self.assertIn("COUNT", queries[0]["sql"])
+        self.assertNotIn("JOIN", queries[0]["sql"])
+
+
+class UserTasksListTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Task", "Tasker", "tasker@taskizy.com", "password"
+        )
+        room = Room.objects.create(room_name="Room", room_admin=self.user)
+
+        for index in range(12):
+            creator = User.objects.create_user(
+                "Task", "Creator", f"creator-{index}@taskizy.com", "password"
+            )
+            Task.objects.create(
+                description=f"Task {index}",
+                creator=creator,
+                tasker=self.user,
+                room=room,
+            )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/tasks/user/{self.user.pk}/"
+
+    def test_task_list_query_count(self):
+        # The versions, the count, and the page with its rooms and users,
+        # whatever the number of creators and taskers
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]["tasks"]), 10)
+        self.assertEqual(
+            response.data["results"]["tasks"][0]["creator"]["email"],
+            "creator-11@taskizy.com",
+        )
+
+    def test_pages_carry_their_count_and_links(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"page": 2})
+
+        self.assertEqual(
+            list(response.data),
+            ["count", "total_pages", "next", "previous", "results"],
+        )
+        self.assertEqual(response.data["count"], 12)
+        self.assertEqual(response.data["total_pages"], 2)
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(response.data["previous"], f"http://testserver{self.url}")
+        self.assertEqual(len(response.data["results"]["tasks"]), 2)
+
+        # The tasks are counted without the joins of the page
+        (count,) = [query["sql"] for query in queries if "__count" in query["sql"]]
+        self.assertNotIn("JOIN", count)
+
+
+class TaskCursorPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Task", "Tasker", "tasker@taskizy.com", "password"
+        )
+        other = User.objects.create_user(
+            "Task", "Creator", "creator@taskizy.com", "password"
+        )
+        room = Room.objects.create(room_name="Room", room_admin=self.user)
+
+        # Open and completed tasks interleaved, over more than two pages
+        for index in range(27):
+            Task.objects.create(
+                description=f"Task {index}",
+                is_completed=index % 3 == 0,
+                creator=other if index % 2 else self.user,
+                tasker=self.user,
+                room=room,
+            )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, query):
+        url = f"/api/tasks/user/{self.user.pk}/?pagination=cursor{query}"
+        pages = []
+
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+            results = response.data["results"]["tasks"]
+            pages.append([task["task_id"] for task in results])
+            url = response.data["next"]
+
+        return pages
+
+    def test_pages_list_every_task_once(self):
+        tasks = Task.objects.order_by("is_completed", "-task_id")
+
+        for query, expected in [
+            ("", tasks),
+            ("&is_completed=false", tasks.filter(is_completed=False)),
+            ("&is_completed=true", tasks.filter(is_completed=True)),
+            (f"&creator_id={self.user.pk}", tasks.filter(creator=self.user)),
+        ]:
+            with self.subTest(query=query):
+                pages = self.walk(query)
+                task_ids = [task_id for page in pages for task_id in page]
+
+                self.assertEqual(
+                    task_ids, list(expected.values_list("task_id", flat=True))
+                )
+                self.assertTrue(all(len(page) == 10 for page in pages[:-1]))
+
+
+class TasksExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Task", "Creator", "creator@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        for index in range(3):
+            Task.objects.create(
+                description=f"Task {index}",
+                creator=self.user,
+                tasker=self.user if index else None,
+                room=self.room,
+            )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/task/room/{self.room.pk}/export/"
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url)
+        lines = b"".join(response.streaming_content).splitlines()
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            TasksListSerializer(
+                Task.objects.order_by("is_completed", "-task_id"), many=True
+            ).data,
+        )
+
+    async def test_export_is_streamed_asynchronously_over_asgi(self):
+        expected = await sync_to_async(self.client.get)(self.url)
+        expected = await sync_to_async(b"".join)(expected.streaming_content)
+
+        with self.settings(ASYNC_VIEWS=True):
+            response = await sync_to_async(self.client.get)(self.url)
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(b"".join([part async for part in response]), expected)
+
+    def test_csv_export(self):
+        response = self.client.get(self.url, {"output": "csv"})
+        rows = list(
+            csv.DictReader(b"".join(response.streaming_content).decode().splitlines())
+        )
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["creator_email"], "creator@taskizy.com")
+        self.assertEqual(rows[-1]["tasker_email"], "")
+
+
+class TasksBulkMutationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Task", "Creator", "creator@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        for index in range(3):
+            Task.objects.create(
+                description=f"Task {index}",
+                tasker=self.user,
+                room=self.room,
+                is_completed=index == 0,
+            )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/task/room/{self.room.pk}/bulk/"
+
+    def test_unknown_filters_are_rejected(self):
+        response = self.client.post(
+            self.url,
+            {"action": "delete", "filter": {"is_complete": True}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("filter", response.data)
+        self.assertEqual(Task.objects.count(), 3)
+
+    def test_filtered_delete(self):
+        response = self.client.post(
+            self.url,
+            {"action": "delete", "filter": {"is_completed": False}},
+            format="json",
+        )
+
+        self.assertEqual(response.data["affected"], 2)
+        self.assertEqual(
+            list(Task.objects.values_list("is_completed", flat=True)), [True]
+        )
+
+
+class RoomTaskCountersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Task", "Creator", "creator@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/task/room/{self.room.pk}/"
+
+    def assertCountersMatchTasks(self):
+        room = Room.objects.get(pk=self.room.pk)
+        counts = Task.objects.filter(room=room).aggregate(
+            tasks=Count("pk"),
+            completed_tasks=Count("pk", filter=Q(is_completed=True)),
+        )
+
+        self.assertEqual(
+            {"tasks": room.task_count, "completed_tasks": room.completed_task_count},
+            counts,
+        )
+
+    def test_counters_follow_task_writes(self):
+        task = self.client.post(
+            f"{self.url}create/",
+            {"description": "Task", "is_urgent": False, "tasker": self.user.pk},
+            format="json",
+        ).data
+        self.client.post(
+            f"{self.url}create/",
+            [
+                {
+                    "description": f"Task {index}",
+                    "is_urgent": False,
+                    "tasker": self.user.pk,
+                }
+                for index in range(4)
+            ],
+            format="json",
+        )
+        self.assertCountersMatchTasks()
+
+        self.client.patch(
+            f"{self.url}task/{task['task_id']}/mark-done/",
+            {"is_completed": True},
+            format="json",
+        )
+        task_ids = list(Task.objects.values_list("task_id", flat=True)[:2])
+        self.client.post(
+            f"{self.url}bulk/",
+            {"action": "complete", "task_ids": task_ids},
+            format="json",
+        )
+        self.assertCountersMatchTasks()
+        self.assertEqual(Room.objects.get(pk=self.room.pk).completed_task_count, 2)
+
+        self.client.delete(f"{self.url}task/{task['task_id']}/delete/")
+        self.assertCountersMatchTasks()
+
+        self.client.post(
+            f"{self.url}bulk/",
+            {"action": "delete", "filter": {"is_completed": False}},
+            format="json",
+        )
+        self.assertCountersMatchTasks()
+        self.assertEqual(Room.objects.get(pk=self.room.pk).task_count, 1)
+
+    def test_invalid_edits_take_no_change_seq(self):
+        task = Task.objects.create(description="Task", room=self.room)
+        room = Room.objects.get(pk=self.room.pk)
+
+        response = self.client.patch(
+            f"{self.url}task/{task.task_id}/mark-done/",
+            {"is_completed": "maybe"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            Room.objects.values("change_seq", "updated_on").get(pk=room.pk),
+            {"change_seq": room.change_seq, "updated_on": room.updated_on},
+        )
+
+    def test_task_saves_leave_the_counters_to_the_views(self):
+        # Counters are not maintained by a signal on every task save
+        Task.objects.create(description="Task", room=self.room)
+
+        room = Room.objects.get(pk=self.room.pk)
+        self.assertEqual(room.task_count, 0)
+
+        # Repaired rooms are marked as changed, correct ones are left alone
+        self.assertEqual(Room.objects.recount_tasks(), 1)
+        self.assertCountersMatchTasks()
+        self.assertGreater(Room.objects.get(pk=room.pk).updated_on, room.updated_on)
+        self.assertEqual(Room.objects.recount_tasks(), 0)
+
+
+class TaskCreateTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Task", "Creator", "creator@taskizy.com", "password"
+        )
+        self.outsider = User.objects.create_user(
+            "Task", "Outsider", "outsider@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/task/room/{self.room.pk}/create/"
+
+    def task(self, tasker):
+        return {"description": "Task", "is_urgent": False, "tasker": tasker.pk}
+
+    def test_create_one_task(self):
+        response = self.client.post(self.url, self.task(self.user), format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["tasker"]["id"], self.user.pk)
+
+        response = self.client.post(self.url, self.task(self.outsider), format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data, {"tasker": ["Tasker is not a member of the room."]}
+        )
+
+    def test_create_many_tasks(self):
+        # The room with the caller's membership, and the membership of all
+        # taskers in one query
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                self.url,
+                [self.task(self.user), self.task(self.outsider)],
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data,
+            [{}, {"tasker": ["Tasker is not a member of the room."]}],
+        )
+
+        response = self.client.post(
+            self.url, [self.task(self.user)] * 3, format="json"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(Task.objects.filter(room=self.room).count(), 3)
+
+
+class ExplainHotQueriesTest(TestCase):
+    def test_refuses_to_run_without_debug_or_yes(self):
+        with self.assertRaisesMessage(CommandError, "pass --yes"):
+            call_command("explain_hot_queries", stdout=StringIO())
+
+        self.assertFalse(User.objects.exists())
@@ -1,4 +1,5 @@
 from django.urls import path
+from taskizy.async_views import as_view
 from .views import *
 
 urlpatterns = [
@@ -17,9 +18,19 @@ urlpatterns = [
         TaskRetrieveUpdateDestroyView.as_view(),
         name="task-delete",
     ),
+    path(
+        "task/room/<int:room_id>/bulk/",
+        TasksBulkMutationView.as_view(),
+        name="task-bulk",
+    ),
+    path(
+        "task/room/<int:room_id>/export/",
+        TasksExportView.as_view(),
+        name="task-export",
+    ),
     path(
         "tasks/user/<int:pk>/",
-        UserTasksListCreateView.as_view(),
+        as_view(UserTasksListCreateView, AsyncUserTasksListView),
         name="user-tasks",
     ),
 ]
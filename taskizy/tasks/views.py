@@ -1,14 +1,35 @@
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.pagination import PageNumberPagination
-from django.core.paginator import Paginator
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.generics import (
+    GenericAPIView,
+    ListCreateAPIView,
+    RetrieveUpdateDestroyAPIView,
+)
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from taskizy import conditional
+from taskizy.async_views import AsyncAPIViewMixin, iterate_in_thread
+from taskizy.renderers import FastJSONRenderer
+from taskizy.pagination import TaskizyPagination, CursorPaginationOptInMixin
+from rooms import events
+from rooms.models import Room, Tombstone
+from rooms.permissions import IsRoomMember, get_room
+from users.serializers import UserSerializer
 from .models import Task
-from .serializers import TasksListSerializer, TaskCreateSerializer
+from .serializers import (
+    TasksListSerializer,
+    TasksListValuesSerializer,
+    TaskCreateSerializer,
+    TaskBulkMutationSerializer,
+)
 from .filters import TaskFilter
+import csv
 
 
 User = get_user_model()
@@ -19,9 +40,9 @@ class TasksListCreateView(ListCreateAPIView):
     View for retrieving a task list of a room and also create ones.
     """
 
-    queryset = Task.objects.all()
+    queryset = Task.objects.for_listing()
     serializer_class = TasksListSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, IsRoomMember)
 
     def list(self, request, room_id, room_slug):
         queryset = self.get_queryset().filter(room_id=room_id)
@@ -36,6 +57,10 @@ class TasksListCreateView(ListCreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def create(self, request, room_id):
+        # A list of tasks is created in one batch
+        if isinstance(request.data, list):
+            return self.create_many(request, room_id)
+
         serializer = TaskCreateSerializer(
             data=request.data,
             context={
@@ -45,26 +70,66 @@ class TasksListCreateView(ListCreateAPIView):
         )
 
         if serializer.is_valid():
-            task = serializer.save()
-            return Response(
-                TasksListSerializer(task).data, status=status.HTTP_201_CREATED
-            )
+            with transaction.atomic():
+                change_seq = Room.objects.next_change_seq(room_id)
+                task = serializer.save(change_seq=change_seq)
+                Room.objects.adjust_task_counts(task.room_id, tasks=1)
+                data = TasksListSerializer(task).data
+                events.publish(
+                    room_id, events.TASKS_CREATED, {"tasks": [data]}, change_seq
+                )
+
+            return Response(data, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def create_many(self, request, room_id):
+        serializer = TaskCreateSerializer(
+            data=request.data,
+            many=True,
+            context={
+                "request": request,
+                "room_id": room_id,
+            },
+        )
+
+        if serializer.is_valid():
+            with transaction.atomic():
+                change_seq = Room.objects.next_change_seq(room_id)
+                tasks = serializer.save(change_seq=change_seq)
+                Room.objects.adjust_task_counts(room_id, tasks=len(tasks))
+                data = TasksListSerializer(tasks, many=True).data
+                events.publish(
+                    room_id, events.TASKS_CREATED, {"tasks": data}, change_seq
+                )
+
+            return Response(data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserTasksListCreateView(ListCreateAPIView):
+class UserTasksListCreateView(CursorPaginationOptInMixin, ListCreateAPIView):
     """
     View for retrieve a list of user tasks and create task.
+
+    Tasks are paginated by page number, or by cursor with `?pagination=cursor`.
     """
 
-    queryset = Task.objects.all()
+    queryset = Task.objects.for_listing()
     serializer_class = TasksListSerializer
     permission_classes = (IsAuthenticated,)
-    pagination_class = PageNumberPagination
+    pagination_class = TaskizyPagination
     filter_backends = [DjangoFilterBackend]  # Use DjangoFilterBackend for filtering
     filterset_class = TaskFilter  # Use the TaskFilter you defined
 
+    # Answer unchanged task lists from one aggregate over the tasks, their
+    # rooms cover deleted tasks and renamed users
+    version_aggregates = {
+        "task_count": Count("pk"),
+        "tasks_updated_on": Max("updated_on"),
+        "rooms_updated_on": Max("room__updated_on"),
+    }
+
     def list(self, request, *args, **kwargs):
         try:
             user = request.user.id
@@ -74,66 +139,128 @@ class UserTasksListCreateView(ListCreateAPIView):
             if user != userID_from_url:
                 return Response(status=status.HTTP_400_BAD_REQUEST)
 
-            # Get the filtered tasks using django-filter
-            filtered_tasks = TaskFilter(
-                request.GET,
-                queryset=self.get_queryset()
-                .filter(tasker=User.objects.get(pk=user))
-                .order_by("-task_id"),
-            ).qs
-
-            # Paginate the filtered tasks
-            paginator = Paginator(filtered_tasks, self.pagination_class.page_size)
-
-            # Calculate the total number of pages
-            total_pages = paginator.num_pages
-
-            # Query the tasks based on the filter/s
-            page = self.paginate_queryset(
-                filtered_tasks.order_by("is_completed", "-task_id")
+            etag, last_modified = self.get_validators(
+                Task.objects.filter(tasker=user).aggregate(**self.version_aggregates)
             )
-
-            # Serialize the tasks
-            tasks_serialized = (
-                [TasksListSerializer(task).data for task in page]
-                if page is not None
-                else []
+            not_modified = conditional.get_not_modified_response(
+                request, etag, last_modified
             )
 
-            # Return the response
-            response_data = {
-                "tasks": tasks_serialized,
-                "total_pages": total_pages,
-            }
+            if not_modified is not None:
+                return not_modified
 
-            return (
-                self.get_paginated_response(response_data)
-                if page is not None
-                else Response(response_data, status=status.HTTP_200_OK)
-            )
+            # Query the tasks based on the filter/s, the page also holds the
+            # total number of pages
+            page = self.paginate_tasks(self.get_tasks(user))
+
+            return self.get_tasks_response(page, etag, last_modified)
 
         except User.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
+    def get_validators(self, versions):
+        timestamps = [
+            versions[name]
+            for name in ("tasks_updated_on", "rooms_updated_on")
+            if versions[name] is not None
+        ]
+
+        return conditional.get_validators(
+            self.request,
+            max(timestamps, default=None),
+            versions["task_count"],
+        )
+
+    def get_tasks(self, user):
+        # Get the filtered tasks using django-filter
+        filtered_tasks = TaskFilter(
+            self.request.GET,
+            queryset=self.get_queryset().filter(tasker=user).order_by("-task_id"),
+        ).qs
+
+        return filtered_tasks.order_by("is_completed", "-task_id")
+
+    def paginate_tasks(self, tasks):
+        # Rows are counted from the tasks, without the joins of their columns
+        return self.paginate_queryset(
+            TasksListValuesSerializer.values(tasks), count_queryset=tasks
+        )
+
+    def get_tasks_response(self, page, etag, last_modified):
+        # Serialize the tasks
+        tasks_serialized = (
+            TasksListValuesSerializer.serialize(page) if page is not None else []
+        )
+
+        # Return the response
+        response_data = {
+            "tasks": tasks_serialized,
+        }
+
+        response = (
+            self.get_paginated_response(response_data)
+            if page is not None
+            else Response(response_data, status=status.HTTP_200_OK)
+        )
+
+        return conditional.set_validators(response, etag, last_modified)
+
     def create(self, request, *args, **kwargs):
         pass
 
 
+class AsyncUserTasksListView(AsyncAPIViewMixin, UserTasksListCreateView):
+    """
+    Async UserTasksListCreateView.list, for the ASGI deployment.
+
+    The versions, the page of tasks and its count are queried through the
+    async ORM.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        user = request.user.id
+
+        if user != self.kwargs.get("pk"):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        etag, last_modified = self.get_validators(
+            await Task.objects.filter(tasker=user).aaggregate(**self.version_aggregates)
+        )
+        not_modified = conditional.get_not_modified_response(
+            request, etag, last_modified
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        tasks = self.get_tasks(user)
+        page = await self.apaginate_queryset(
+            TasksListValuesSerializer.values(tasks), count_queryset=tasks
+        )
+
+        return self.get_tasks_response(page, etag, last_modified)
+
+
 class TaskRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
     """
     View for executing RUD on selected task.
     """
 
-    queryset = Task.objects.all()
+    queryset = Task.objects.for_listing()
     serializer_class = TasksListSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, IsRoomMember)
 
     def get_object(self):
         task_id = int(self.kwargs.get("task_id"))
         room_id = int(self.kwargs.get("room_id"))
 
         try:
-            queryset = Task.objects.filter(task_id=task_id, room=room_id)
+            queryset = self.get_queryset().filter(task_id=task_id, room=room_id)
+
+            # Lock the task while it is changed, to keep the room counters exact
+            if self.request.method not in SAFE_METHODS:
+                queryset = queryset.select_for_update(of=("self",))
+
             instance = queryset.get()
 
             return instance
@@ -145,15 +272,31 @@ class TaskRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
         pass
 
     def update(self, request, *args, **kwargs):
+        # Invalid edits are answered before the room is locked, so they take
+        # no change_seq
+        serializer = self.get_serializer(data=request.data, partial=True)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            instance = self.get_object()
-            serializer = self.get_serializer(instance, data=request.data, partial=True)
+            with transaction.atomic():
+                # The room is locked before the task, as by every write to
+                # the tasks of a room
+                change_seq = Room.objects.next_change_seq(self.kwargs["room_id"])
+                serializer.instance = instance = self.get_object()
+                was_completed = instance.is_completed
+
+                task = serializer.save(change_seq=change_seq)
+                Room.objects.adjust_task_counts(
+                    task.room_id,
+                    completed_tasks=int(task.is_completed) - int(was_completed),
+                )
+                events.publish(
+                    task.room_id, events.TASK_UPDATED, serializer.data, change_seq
+                )
 
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            else:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
         except Task.DoesNotExist:
             return Response(
@@ -163,10 +306,210 @@ class TaskRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
 
     def destroy(self, request, *args, **kwargs):
         try:
-            instance = self.get_object()
-            instance.delete()
+            with transaction.atomic():
+                change_seq = Room.objects.next_change_seq(self.kwargs["room_id"])
+                instance = self.get_object()
+                task_id = instance.task_id
+                instance.delete()
+                Room.objects.adjust_task_counts(
+                    instance.room_id,
+                    tasks=-1,
+                    completed_tasks=-int(instance.is_completed),
+                )
+                Tombstone.bury(instance.room_id, Tombstone.TASK, [task_id], change_seq)
+                events.publish(
+                    instance.room_id,
+                    events.TASK_DELETED,
+                    {"task_id": task_id},
+                    change_seq,
+                )
 
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         except Task.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
+
+
+class TasksBulkMutationView(GenericAPIView):
+    """
+    View for completing, reassigning or deleting many tasks of a room at once.
+    """
+
+    serializer_class = TaskBulkMutationSerializer
+    permission_classes = (IsAuthenticated, IsRoomMember)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["room_id"] = self.kwargs["room_id"]
+        return context
+
+    def post(self, request, room_id):
+        serializer = self.get_serializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        action = serializer.validated_data["action"]
+        tasks = serializer.get_tasks()
+
+        # One set-based statement per change, counted into the room counters
+        with transaction.atomic():
+            change_seq = Room.objects.next_change_seq(room_id)
+
+            if action == "complete":
+                affected = tasks.filter(is_completed=False).update(
+                    is_completed=True, updated_on=timezone.now(), change_seq=change_seq
+                )
+                Room.objects.adjust_task_counts(room_id, completed_tasks=affected)
+
+            elif action == "uncomplete":
+                affected = tasks.filter(is_completed=True).update(
+                    is_completed=False, updated_on=timezone.now(), change_seq=change_seq
+                )
+                Room.objects.adjust_task_counts(room_id, completed_tasks=-affected)
+
+            elif action == "reassign":
+                affected = tasks.update(
+                    tasker=serializer.validated_data["tasker"],
+                    updated_on=timezone.now(),
+                    change_seq=change_seq,
+                )
+                Room.objects.touch([room_id])
+
+            else:
+                # The tasks are read once, for their tombstones and the
+                # counters, then deleted in one statement. The locked room keeps
+                # other writes to its tasks out meanwhile
+                selected = list(tasks.values_list("task_id", "is_completed"))
+                task_ids = [task_id for task_id, _ in selected]
+                completed = sum(is_completed for _, is_completed in selected)
+                affected, _ = Task.objects.filter(task_id__in=task_ids).delete()
+                Room.objects.adjust_task_counts(
+                    room_id,
+                    tasks=-affected,
+                    completed_tasks=-completed,
+                )
+                Tombstone.bury(room_id, Tombstone.TASK, task_ids, change_seq)
+
+            # The selection is sent as given, clients apply it to the tasks
+            # they hold instead of re-fetching them
+            if affected:
+                events.publish(
+                    room_id,
+                    events.TASKS_BULK_CHANGED,
+                    {"affected": affected, **serializer.validated_data},
+                    change_seq,
+                )
+
+        return Response(
+            data={"action": action, "affected": affected},
+            status=status.HTTP_200_OK,
+        )
+
+
+class Echo:
+    """
+    File-like object that returns what is written to it, so csv.writer
+    formats rows without buffering them.
+    """
+
+    def write(self, value):
+        return value
+
+
+class TasksExportView(GenericAPIView):
+    """
+    View for exporting all tasks of a room, with their creator and tasker,
+    as NDJSON, or as CSV with `?output=csv`.
+
+    Tasks are read in chunks through a server-side cursor and streamed as
+    they are serialized, so memory stays flat whatever the size of the room.
+    Under ASGI, every write is read in the thread of the sync code and sent
+    from the event loop.
+    """
+
+    permission_classes = (IsAuthenticated, IsRoomMember)
+    chunk_size = 2000
+    lines_per_write = 500
+    content_types = {
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv",
+    }
+
+    def get(self, request, room_id):
+        output = request.query_params.get("output", "ndjson")
+
+        if output not in self.content_types:
+            return Response(
+                {"output": [f"Must be one of: {', '.join(self.content_types)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        room = get_room(request, room_id)
+        rows = TasksListValuesSerializer.values(
+            Task.objects.filter(room_id=room_id).order_by("is_completed", "-task_id")
+        ).iterator(chunk_size=self.chunk_size)
+        tasks = (TasksListValuesSerializer.to_representation(row) for row in rows)
+
+        lines = self.csv_lines(tasks) if output == "csv" else self.ndjson_lines(tasks)
+        content = self.buffered(lines)
+
+        # Under ASGI, sync iterators would be read whole before being sent
+        if settings.ASYNC_VIEWS:
+            content = iterate_in_thread(content)
+
+        response = StreamingHttpResponse(
+            content, content_type=self.content_types[output]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{room.room_slug}-tasks.{output}"'
+        )
+
+        return response
+
+    def buffered(self, lines):
+        """
+        Join lines into fewer, larger writes.
+        """
+        buffer = []
+
+        for line in lines:
+            buffer.append(line)
+
+            if len(buffer) >= self.lines_per_write:
+                yield "".join(buffer)
+                buffer = []
+
+        if buffer:
+            yield "".join(buffer)
+
+    def ndjson_lines(self, tasks):
+        renderer = FastJSONRenderer()
+
+        for task in tasks:
+            yield renderer.render(task).decode() + "\n"
+
+    def csv_lines(self, tasks):
+        writer = csv.writer(Echo())
+        user_fields = UserSerializer.Meta.fields
+        task_fields = [
+            name
+            for name in TasksListValuesSerializer.get_field_names()
+            if name not in ("creator", "tasker")
+        ]
+
+        yield writer.writerow(
+            task_fields
+            + [f"creator_{name}" for name in user_fields]
+            + [f"tasker_{name}" for name in user_fields]
+        )
+
+        for task in tasks:
+            row = [task[name] for name in task_fields]
+
+            for user in (task["creator"], task["tasker"]):
+                row += [
+                    user[name] if user is not None else None for name in user_fields
+                ]
+
+            yield writer.writerow(row)
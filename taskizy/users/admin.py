@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from .forms import CustomUserCreationForm, CustomUserChangeForm
-from .models import User
+from .models import QueuedEmail, User
 
 
 class UserAdmin(BaseUserAdmin):
@@ -71,4 +71,11 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "status", "attempts", "next_attempt_on", "created_on"]
+    list_filter = ["status"]
+    readonly_fields = ["message", "attempts", "last_error", "created_on"]
+
+
 admin.site.register(User, UserAdmin)
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
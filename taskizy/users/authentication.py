@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+
+User = get_user_model()
+
+CLAIMS_VERSION_CLAIM = "claims_version"
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    User built from the claims of an access token.
+
+    The id and names are read from the token, any other attribute loads the
+    user row from the database on first access, and fails authentication if
+    the user was deleted meanwhile.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.__dict__["_token"] = token
+        lookup = {api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]}
+
+        def get_user():
+            try:
+                return User.objects.get(**lookup)
+            except User.DoesNotExist:
+                raise AuthenticationFailed("User not found", code="user_not_found")
+
+        super().__init__(get_user)
+
+    def get_claim(self, name):
+        if self._wrapped is not empty:
+            return getattr(self._wrapped, name)
+        return self._token.get(name)
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def pk(self):
+        if self._wrapped is not empty:
+            return self._wrapped.pk
+        return self._token[api_settings.USER_ID_CLAIM]
+
+    @property
+    def first_name(self):
+        return self.get_claim("first_name")
+
+    @property
+    def last_name(self):
+        return self.get_claim("last_name")
+
+    @property
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f"<ClaimsUser: {self.pk}>"
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the claims of the token instead of loading
+    the user on every request.
+
+    Tokens carry the `claims_version` of the user they were issued for, and
+    the current version of every user is kept in the
+    `CLAIMS_VERSION_CACHE_ALIAS` cache for `CLAIMS_VERSION_CACHE_TIMEOUT`
+    seconds. Tokens with an older version, or users without a cached
+    version, fall back to loading the user, so deactivated users and changed
+    names are picked up at once by the process that changed them, and within
+    the timeout by the others.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+
+        claims_version = validated_token.get(CLAIMS_VERSION_CLAIM)
+
+        if (
+            claims_version is not None
+            and User.get_cached_claims_version(user_id) == claims_version
+        ):
+            return ClaimsUser(validated_token)
+
+        user = super().get_user(validated_token)
+        user.cache_claims_version()
+
+        return user
@@ -0,0 +1,136 @@
+"""
+Profile images, processed off the request.
+
+An uploaded image is validated and downscaled to `USER_IMAGE_SIZE` with
+Pillow while the request is served, which is cheap at that size, and the
+result is queued in the database as a `UserImageUpload`. The
+`upload_user_images` command stores queued images in the user's
+`user_image` storage, which is Cloudinary in production, so requests never
+wait on it. `User.save` then caches the URL of the stored image in
+`user_image_url`, which is what serializers and tokens render.
+"""
+
+from datetime import timedelta
+from io import BytesIO
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+from .models import UserImageUpload
+
+
+# Time a worker has to store the images it took
+UPLOAD_LEASE = timedelta(minutes=5)
+
+
+def process_image(file):
+    """
+    Downscale an uploaded image to fit `USER_IMAGE_SIZE`, as a PNG when it
+    is transparent and as a JPEG otherwise, and return it as a ContentFile.
+    """
+    size = settings.USER_IMAGE_SIZE
+    file.seek(0)
+
+    try:
+        with Image.open(file) as image:
+            if image.width * image.height > settings.USER_IMAGE_MAX_PIXELS:
+                raise serializers.ValidationError("The image is too large.")
+
+            # JPEGs are decoded at the smallest scale that still fits the size
+            image.draft("RGB", (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+            output = BytesIO()
+
+            if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+                image.convert("RGBA").save(output, "PNG", optimize=True)
+                extension = "png"
+            else:
+                image.convert("RGB").save(output, "JPEG", quality=85, optimize=True)
+                extension = "jpg"
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise serializers.ValidationError("Upload a valid image.")
+
+    return ContentFile(output.getvalue(), name=f"{uuid4().hex}.{extension}")
+
+
+def queue_image(user, image):
+    """
+    Queue a processed image to become the profile image of the user,
+    replacing one that is still queued.
+    """
+    return UserImageUpload.objects.update_or_create(
+        user=user,
+        defaults={
+            "name": image.name,
+            "image": image.read(),
+            "status": UserImageUpload.PENDING,
+            "attempts": 0,
+            "next_attempt_on": timezone.now(),
+            "last_error": "",
+        },
+    )[0]
+
+
+def claim_batch(batch_size):
+    """
+    The queued images that are due, leased for `UPLOAD_LEASE` so that other
+    workers skip them meanwhile.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        uploads = list(
+            UserImageUpload.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("user")
+            .filter(status=UserImageUpload.PENDING, next_attempt_on__lte=now)
+            .order_by("next_attempt_on")[:batch_size]
+        )
+        UserImageUpload.objects.filter(
+            pk__in=[upload.pk for upload in uploads]
+        ).update(next_attempt_on=now + UPLOAD_LEASE)
+
+    return uploads
+
+
+def upload_batch(batch_size):
+    """
+    Store a batch of queued images, and return the number of images stored
+    and failed.
+    """
+    uploaded = 0
+    failed = 0
+
+    for upload in claim_batch(batch_size):
+        # Images queued again meanwhile are left for their own turn
+        queued = UserImageUpload.objects.filter(pk=upload.pk, name=upload.name)
+
+        try:
+            user = upload.user
+            user.user_image.save(
+                upload.name, ContentFile(bytes(upload.image)), save=False
+            )
+            # Only the image, other fields may have changed since it was queued
+            user.save(update_fields=["user_image"])
+        except Exception as exc:
+            failed += 1
+            attempts = upload.attempts + 1
+            changes = {"attempts": attempts, "last_error": repr(exc)}
+
+            if attempts >= settings.USER_IMAGE_MAX_ATTEMPTS:
+                changes["status"] = UserImageUpload.FAILED
+            else:
+                delay = settings.USER_IMAGE_RETRY_DELAY * 2 ** (attempts - 1)
+                changes["next_attempt_on"] = timezone.now() + timedelta(seconds=delay)
+
+            queued.update(**changes)
+        else:
+            uploaded += 1
+            queued.delete()
+
+    return uploaded, failed
@@ -0,0 +1,186 @@
+"""
+Database-backed outbox for the emails sent by the API.
+
+`OutboxEmailBackend` is the `EMAIL_BACKEND`, so sending an email, like
+djoser's activation and confirmation emails, only stores it in the current
+transaction: requests never wait on the mail server, and the emails of a
+request that is rolled back are never sent.
+
+The `send_queued_email` command delivers the queue through
+`EMAIL_OUTBOX_BACKEND`, one connection per batch, and retries failed emails
+with an exponential backoff.
+"""
+
+from base64 import b64decode, b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+from .models import QueuedEmail
+
+
+def dump_message(message):
+    """
+    The fields of an EmailMessage, as JSON.
+    """
+    attachments = []
+
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError(
+                "Only (filename, content, mimetype) attachments can be queued."
+            )
+
+        filename, content, mimetype = attachment
+        is_binary = isinstance(content, bytes)
+
+        if is_binary:
+            content = b64encode(content).decode("ascii")
+
+        attachments.append([filename, content, mimetype, is_binary])
+
+    return {
+        "subject": str(message.subject),
+        "body": str(message.body),
+        "content_subtype": message.content_subtype,
+        "from_email": message.from_email,
+        "to": list(message.to),
+        "cc": list(message.cc),
+        "bcc": list(message.bcc),
+        "reply_to": list(message.reply_to),
+        "headers": message.extra_headers,
+        "alternatives": [
+            [str(content), mimetype]
+            for content, mimetype in getattr(message, "alternatives", [])
+        ],
+        "attachments": attachments,
+    }
+
+
+def load_message(data, connection=None):
+    """
+    The EmailMessage of fields written by `dump_message`.
+    """
+    message = EmailMultiAlternatives(
+        subject=data["subject"],
+        body=data["body"],
+        from_email=data["from_email"],
+        to=data["to"],
+        cc=data["cc"],
+        bcc=data["bcc"],
+        reply_to=data["reply_to"],
+        headers=data["headers"],
+        alternatives=[tuple(alternative) for alternative in data["alternatives"]],
+        connection=connection,
+    )
+    message.content_subtype = data["content_subtype"]
+
+    for filename, content, mimetype, is_binary in data["attachments"]:
+        message.attach(filename, b64decode(content) if is_binary else content, mimetype)
+
+    return message
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Queue emails for `send_queued_email` instead of sending them.
+    """
+
+    def send_messages(self, email_messages):
+        try:
+            queued = QueuedEmail.objects.bulk_create(
+                QueuedEmail(message=dump_message(message))
+                for message in email_messages
+            )
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+
+        return len(queued)
+
+
+def get_retry_delay(attempts):
+    """
+    How long to wait after the given number of failed attempts, doubling
+    from `EMAIL_OUTBOX_RETRY_DELAY` up to `EMAIL_OUTBOX_MAX_RETRY_DELAY`.
+    """
+    return timedelta(
+        seconds=min(
+            settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+            settings.EMAIL_OUTBOX_MAX_RETRY_DELAY,
+        )
+    )
+
+
+def claim_batch(batch_size):
+    """
+    The pending emails that are due, leased for `EMAIL_OUTBOX_LEASE` seconds
+    so that other workers skip them meanwhile.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        emails = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=QueuedEmail.PENDING, next_attempt_on__lte=now)
+            .order_by("next_attempt_on")[:batch_size]
+        )
+        QueuedEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            next_attempt_on=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+        )
+
+    return emails
+
+
+def send_batch(batch_size):
+    """
+    Send a batch of due emails over one connection, and return the number
+    of emails sent and failed.
+    """
+    emails = claim_batch(batch_size)
+
+    if not emails:
+        return 0, 0
+
+    sent = []
+    failed = []
+    connection = get_connection(settings.EMAIL_OUTBOX_BACKEND)
+
+    try:
+        connection.open()
+    except Exception as exc:
+        failed = [(email, exc) for email in emails]
+    else:
+        try:
+            for email in emails:
+                try:
+                    connection.send_messages([load_message(email.message)])
+                except Exception as exc:
+                    failed.append((email, exc))
+                else:
+                    sent.append(email.pk)
+        finally:
+            connection.close()
+
+    QueuedEmail.objects.filter(pk__in=sent).delete()
+
+    now = timezone.now()
+
+    for email, exc in failed:
+        email.attempts += 1
+        email.last_error = repr(exc)
+
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = QueuedEmail.FAILED
+        else:
+            email.next_attempt_on = now + get_retry_delay(email.attempts)
+
+        email.save(
+            update_fields=["attempts", "last_error", "status", "next_attempt_on"]
+        )
+
+    return len(sent), len(failed)
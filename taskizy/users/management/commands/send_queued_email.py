@@ -0,0 +1,47 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from users.mail import send_batch
+
+
+class Command(BaseCommand):
+    help = "Send the emails queued in the outbox, see users/mail.py."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of emails sent over one connection.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep waiting for new emails instead of exiting once sent.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait before looking for new emails with --loop.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        while True:
+            sent, failed = send_batch(batch_size)
+
+            if sent or failed:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Sent {sent} email(s), {failed} failed.")
+                )
+
+            # A full batch means more emails may be due right away
+            if sent + failed == batch_size:
+                continue
+
+            if not options["loop"]:
+                break
+
+            sleep(options["interval"])
@@ -0,0 +1,49 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from users.images import upload_batch
+
+
+class Command(BaseCommand):
+    help = "Store the queued profile images, see users/images.py."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20,
+            help="Number of images taken at once.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep waiting for new images instead of exiting once stored.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait before looking for new images with --loop.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        while True:
+            uploaded, failed = upload_batch(batch_size)
+
+            if uploaded or failed:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Stored {uploaded} image(s), {failed} failed."
+                    )
+                )
+
+            # A full batch means more images may be due right away
+            if uploaded + failed == batch_size:
+                continue
+
+            if not options["loop"]:
+                break
+
+            sleep(options["interval"])
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+SEARCH_COLUMNS = ["email", "first_name", "last_name"]
+
+
+def create_search_indexes(apps, schema_editor):
+    # Trigram indexes serve the case-insensitive substring search of invite
+    # candidates. Other databases fall back to prefix matching without them.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "users_user_{column}_trgm_idx" '
+            f'ON "users_user" USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "users_user_{column}_trgm_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_claims_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
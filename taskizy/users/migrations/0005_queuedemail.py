@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:13
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.JSONField(verbose_name='Message')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=7, verbose_name='Status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt_on', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next Attempt On')),
+                ('last_error', models.TextField(blank=True, verbose_name='Last Error')),
+                ('created_on', models.DateTimeField(auto_now_add=True, verbose_name='Created On')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_on'], name='queuedemail_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def cache_user_image_urls(apps, schema_editor):
+    User = apps.get_model("users", "User")
+
+    for user in User.objects.exclude(user_image="").iterator():
+        user.user_image_url = user.user_image.url
+        user.save(update_fields=["user_image_url"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_queuedemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='user_image_url',
+            field=models.CharField(blank=True, editable=False, max_length=500, verbose_name='User Image URL'),
+        ),
+        migrations.RunPython(cache_user_image_urls, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='UserImageUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('image', models.BinaryField(verbose_name='Image')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=7, verbose_name='Status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt_on', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next Attempt On')),
+                ('last_error', models.TextField(blank=True, verbose_name='Last Error')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='queued_image', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_on'], name='userimageupload_due_idx')],
+            },
+        ),
+    ]
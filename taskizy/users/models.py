@@ -1,5 +1,8 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, PermissionsMixin
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from .managers import CustomUserManager
 
@@ -13,15 +16,197 @@ class User(AbstractUser, PermissionsMixin):
         _("Role"), max_length=50, default="Member", blank=True, null=True
     )
     user_image = models.ImageField(upload_to="profile_images/", blank=True)
+    # URL of user_image, rendered with every user instead of asking the
+    # storage for it each time
+    user_image_url = models.CharField(
+        _("User Image URL"), max_length=500, blank=True, editable=False
+    )
+
+    # Bumped whenever a field carried in, or checked for, access tokens
+    # changes, so tokens with older claims are no longer trusted
+    claims_version = models.PositiveIntegerField(_("Claims Version"), default=0)
 
     objects = CustomUserManager()
 
+    CLAIM_FIELDS = ("first_name", "last_name", "user_image", "is_active", "password")
+    CLAIMS_VERSION_CACHE_KEY = "users:claims-version:{}"
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name"]
 
     def __str__(self):
         return self.email
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._loaded_claims = user.get_claims()
+
+        return user
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+
+        self._loaded_claims = {
+            **getattr(self, "_loaded_claims", {}),
+            **{
+                name: value
+                for name, value in self.get_claims().items()
+                if fields is None or name in fields
+            },
+        }
+
+    def get_claims(self):
+        """
+        The values of the loaded `CLAIM_FIELDS`, images by name.
+        """
+        claims = {}
+
+        for name in self.CLAIM_FIELDS:
+            # Deferred fields are left out rather than loaded
+            if name in self.__dict__:
+                value = self.__dict__[name]
+                claims[name] = getattr(value, "name", value)
+
+        return claims
+
+    def get_changed_claims(self):
+        """
+        The `CLAIM_FIELDS` that differ from when the user was loaded or last
+        saved, all of them for users that were neither.
+        """
+        loaded_claims = getattr(self, "_loaded_claims", None)
+
+        if loaded_claims is None:
+            return set(self.CLAIM_FIELDS)
+
+        claims = self.get_claims()
+
+        return {
+            name
+            for name in claims.keys() | loaded_claims.keys()
+            if claims.get(name) != loaded_claims.get(name)
+        }
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        changed_claims = self.get_changed_claims()
+
+        if update_fields is not None:
+            changed_claims &= set(update_fields)
+
+        if self.pk is not None and changed_claims:
+            self.claims_version += 1
+
+            if update_fields is not None:
+                update_fields = kwargs["update_fields"] = {
+                    *update_fields,
+                    "claims_version",
+                }
+
+        if update_fields is None or "user_image" in update_fields:
+            self.user_image_url = self.user_image.url if self.user_image else ""
+
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "user_image_url"}
+
+        super().save(*args, **kwargs)
+        self._loaded_claims = self.get_claims()
+
+        transaction.on_commit(self.cache_claims_version)
+
+    @staticmethod
+    def get_claims_version_cache():
+        return caches[settings.CLAIMS_VERSION_CACHE_ALIAS]
+
+    def cache_claims_version(self):
+        self.get_claims_version_cache().set(
+            self.CLAIMS_VERSION_CACHE_KEY.format(self.pk),
+            self.claims_version,
+            timeout=settings.CLAIMS_VERSION_CACHE_TIMEOUT,
+        )
+
+    @classmethod
+    def uncache_claims_version(cls, user_id):
+        cls.get_claims_version_cache().delete(
+            cls.CLAIMS_VERSION_CACHE_KEY.format(user_id)
+        )
+
+    @classmethod
+    def get_cached_claims_version(cls, user_id):
+        return cls.get_claims_version_cache().get(
+            cls.CLAIMS_VERSION_CACHE_KEY.format(user_id)
+        )
+
     @property
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}"
+
+
+class QueuedEmail(models.Model):
+    """
+    An email waiting in the outbox for `send_queued_email`, see users/mail.py.
+
+    Sent emails are deleted, emails that failed every attempt are kept as
+    failed.
+    """
+
+    PENDING = "pending"
+    FAILED = "failed"
+    STATUSES = [(PENDING, _("Pending")), (FAILED, _("Failed"))]
+
+    # The fields of the EmailMessage, as written by users.mail.dump_message
+    message = models.JSONField(_("Message"))
+    status = models.CharField(
+        _("Status"), max_length=7, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(_("Attempts"), default=0)
+    next_attempt_on = models.DateTimeField(_("Next Attempt On"), default=timezone.now)
+    last_error = models.TextField(_("Last Error"), blank=True)
+    created_on = models.DateTimeField(_("Created On"), auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Pending emails that are due, in the order they are sent
+            models.Index(
+                fields=["status", "next_attempt_on"],
+                name="queuedemail_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return self.message.get("subject", "")
+
+
+class UserImageUpload(models.Model):
+    """
+    A processed profile image waiting for `upload_user_images` to store it,
+    see users/images.py.
+    """
+
+    PENDING = "pending"
+    FAILED = "failed"
+    STATUSES = [(PENDING, _("Pending")), (FAILED, _("Failed"))]
+
+    user = models.OneToOneField(
+        User,
+        verbose_name=_("User"),
+        on_delete=models.CASCADE,
+        related_name="queued_image",
+    )
+    name = models.CharField(_("Name"), max_length=100)
+    image = models.BinaryField(_("Image"))
+    status = models.CharField(
+        _("Status"), max_length=7, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(_("Attempts"), default=0)
+    next_attempt_on = models.DateTimeField(_("Next Attempt On"), default=timezone.now)
+    last_error = models.TextField(_("Last Error"), blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_on"],
+                name="userimageupload_due_idx",
+            ),
+        ]
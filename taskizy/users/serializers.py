@@ -1,54 +1,109 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
 from rest_framework_simplejwt.views import TokenObtainPairView
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from djoser.serializers import UserCreateSerializer
+from django.db import transaction
+from djoser.serializers import (
+    UserCreatePasswordRetypeSerializer,
+    UserCreateSerializer,
+)
+from .authentication import CLAIMS_VERSION_CLAIM
+from .images import process_image, queue_image
+from .tokens import CachedRefreshToken
 
 
 User = get_user_model()
 
 
-class CreateUserSerializer(UserCreateSerializer):
-    class Meta(UserCreateSerializer.Meta):
+class UserImageField(serializers.ImageField):
+    """
+    Takes an uploaded profile image, downscaled for users/images.py to
+    queue, and renders the cached URL of the stored one.
+    """
+
+    default_error_messages = {
+        "too_large": "The image is larger than {max_size} bytes.",
+    }
+
+    def to_internal_value(self, data):
+        image = super().to_internal_value(data)
+        max_size = settings.USER_IMAGE_MAX_UPLOAD_SIZE
+
+        if image.size > max_size:
+            self.fail("too_large", max_size=max_size)
+
+        return process_image(image)
+
+    def to_representation(self, value):
+        return value or None
+
+
+class UserSerializer(serializers.ModelSerializer):
+    user_image = UserImageField(source="user_image_url", required=False)
+
+    class Meta:
         model = User
         fields = [
             "id",
             "email",
             "first_name",
             "last_name",
-            "password",
+            "role",
             "user_image",
         ]
 
-    def get_user_image(self, obj):
-        try:
-            img = obj.user_image_url
-            return img
-        except ValueError:
-            return None
+    def update(self, instance, validated_data):
+        image = validated_data.pop("user_image_url", None)
 
+        with transaction.atomic():
+            user = super().update(instance, validated_data)
 
-class UserSerializer(serializers.ModelSerializer):
-    class Meta:
+            # Stored by the upload_user_images command, the current image is
+            # served meanwhile
+            if image is not None:
+                queue_image(user, image)
+
+        return user
+
+
+class CreateUserSerializer(UserCreateSerializer):
+    user_image = UserImageField(source="user_image_url", required=False)
+
+    class Meta(UserCreateSerializer.Meta):
         model = User
         fields = [
             "id",
             "email",
             "first_name",
             "last_name",
-            "role",
+            "password",
             "user_image",
         ]
 
-    def get_user_image(self, obj):
-        try:
-            img = obj.user_image_url
-            return img
-        except ValueError:
-            return None
+    def create(self, validated_data):
+        image = validated_data.pop("user_image_url", None)
+
+        with transaction.atomic():
+            user = super().create(validated_data)
+
+            # Stored by the upload_user_images command, like a changed image
+            if image is not None:
+                queue_image(user, image)
+
+        return user
 
-    # def update(self, instance, validated_data):
-    #     pass
+
+class CreateUserPasswordRetypeSerializer(
+    CreateUserSerializer, UserCreatePasswordRetypeSerializer
+):
+    """
+    `CreateUserSerializer` with the `re_password` check djoser registers
+    users with when `USER_CREATE_PASSWORD_RETYPE` is set.
+    """
 
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -58,10 +113,12 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         token["first_name"] = user.first_name
         token["last_name"] = user.last_name
+        token[CLAIMS_VERSION_CLAIM] = user.claims_version
 
-        try:
-            token["user_image"] = user.user_image.url
-        except ValueError:
-            token["user_image"] = None
+        token["user_image"] = user.user_image_url or None
 
         return token
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedRefreshToken
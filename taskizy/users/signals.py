@@ -0,0 +1,14 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # Tokens of deleted users are no longer trusted from their claims
+    user_id = instance.pk
+    transaction.on_commit(lambda: User.uncache_claims_version(user_id))
@@ -1,3 +1,325 @@
-from django.test import TestCase
+import tempfile
+from io import BytesIO, StringIO
+from PIL import Image
+from smtplib import SMTPException
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rooms.models import Room, RoomMember
+from .authentication import ClaimsUser
+from .models import QueuedEmail, UserImageUpload
+from .serializers import MyTokenObtainPairSerializer
+from .tokens import CachedRefreshToken, blacklist_cache
 
-# Create your tests here.
+
+User = get_user_model()
+
+
+class ClaimsJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Claims", "User", "claims@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.user)
+        RoomMember.objects.create(room=self.room, room_member=self.user)
+
+        self.client = APIClient()
+        cache.clear()
+
+    def authenticate(self):
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"JWT {token}")
+
+    def get_room(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(
+                f"/api/room/{self.room.pk}/{self.room.room_slug}/"
+            )
+
+        return response
+
+    def test_user_is_resolved_from_the_token(self):
+        self.authenticate()
+
+        # The first request loads the user and caches its claims version
+        self.assertEqual(self.get_room().status_code, 200)
+
+        # The room with the membership, the room members, and the task count
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get_room().status_code, 200)
+
+    def test_stale_claims_load_the_user(self):
+        self.authenticate()
+        self.get_room()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self.get_room().status_code, 401)
+
+    def test_deleted_users_fail_authentication(self):
+        self.authenticate()
+        self.get_room()
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        claims_user = ClaimsUser(token)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RoomMember.objects.filter(room_member=self.user).delete()
+            self.user.delete()
+
+        self.assertIsNone(User.get_cached_claims_version(token["user_id"]))
+        self.assertEqual(self.get_room().status_code, 401)
+
+        with self.assertRaises(AuthenticationFailed):
+            claims_user.email
+
+    def test_unrelated_updates_keep_the_claims(self):
+        claims_version = self.user.claims_version
+        self.user.save(update_fields=["last_login"])
+
+        self.assertEqual(self.user.claims_version, claims_version)
+
+        user = User.objects.get(pk=self.user.pk)
+        user.role = "Lead"
+        user.save()
+        user.save(update_fields=["first_name", "role"])
+
+        self.assertEqual(user.claims_version, claims_version)
+
+        user.first_name = "Renamed"
+        user.save()
+
+        self.assertEqual(user.claims_version, claims_version + 1)
+        self.assertEqual(
+            User.objects.get(pk=user.pk).claims_version, claims_version + 1
+        )
+
+
+class TokenRefreshTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Token", "User", "token@taskizy.com", "password"
+        )
+        self.refresh = str(MyTokenObtainPairSerializer.get_token(self.user))
+
+        self.client = APIClient()
+        blacklist_cache.clear()
+
+    def test_refresh_checks_the_blacklist_once(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                "/api/token/refresh/", {"refresh": self.refresh}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                "/api/token/refresh/", {"refresh": self.refresh}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_blacklisted_tokens_are_rejected(self):
+        self.client.post("/api/token/refresh/", {"refresh": self.refresh})
+        CachedRefreshToken(self.refresh).blacklist()
+
+        response = self.client.post("/api/token/refresh/", {"refresh": self.refresh})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_prune_tokens(self):
+        CachedRefreshToken(self.refresh).blacklist()
+        OutstandingToken.objects.update(expires_at=timezone.now())
+        MyTokenObtainPairSerializer.get_token(self.user)
+
+        call_command("prune_tokens", chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class InviteCandidatesTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            "Room", "Admin", "admin@taskizy.com", "password"
+        )
+        self.room = Room.objects.create(room_name="Room", room_admin=self.admin)
+        RoomMember.objects.create(room=self.room, room_member=self.admin)
+
+        for first_name in ["Ana", "Andres", "Bea"]:
+            User.objects.create_user(
+                first_name, "User", f"{first_name.lower()}@taskizy.com", "password"
+            )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_members_are_excluded_and_search_matches_names(self):
+        url = f"/api/get-users/{self.room.pk}/"
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["count"], 3)
+
+        response = self.client.get(url, {"search": "an"})
+        self.assertEqual(
+            [user["first_name"] for user in response.data["results"]],
+            ["Ana", "Andres"],
+        )
+
+        response = self.client.get(url, {"search": "room"})
+        self.assertEqual(response.data["count"], 0)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException("Mail server is unavailable.")
+
+
+@override_settings(
+    EMAIL_BACKEND="users.mail.OutboxEmailBackend",
+    EMAIL_OUTBOX_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class EmailOutboxTest(TestCase):
+    def register(self):
+        return APIClient().post(
+            "/api/auth/users/",
+            {
+                "email": "new@taskizy.com",
+                "first_name": "New",
+                "last_name": "User",
+                "password": "a-long-password",
+                "re_password": "a-long-password",
+            },
+            format="json",
+        )
+
+    def test_registration_only_queues_the_activation_email(self):
+        self.assertEqual(self.register().status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+
+        call_command("send_queued_email", stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["new@taskizy.com"])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    @override_settings(
+        EMAIL_OUTBOX_BACKEND="users.tests.FailingEmailBackend",
+        EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+    )
+    def test_failed_emails_are_retried_with_backoff(self):
+        self.register()
+
+        call_command("send_queued_email", stdout=StringIO())
+        email = QueuedEmail.objects.get()
+
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.status, QueuedEmail.PENDING)
+        self.assertGreater(email.next_attempt_on, timezone.now())
+        self.assertIn("Mail server is unavailable.", email.last_error)
+
+        # Not due yet
+        call_command("send_queued_email", stdout=StringIO())
+        self.assertEqual(QueuedEmail.objects.get().attempts, 1)
+
+        QueuedEmail.objects.update(next_attempt_on=timezone.now())
+        call_command("send_queued_email", stdout=StringIO())
+
+        self.assertEqual(QueuedEmail.objects.get().status, QueuedEmail.FAILED)
+        self.assertEqual(mail.outbox, [])
+
+
+class UserImageTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+
+        storage = self.settings(
+            DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+            MEDIA_ROOT=media_root.name,
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.user = User.objects.create_user(
+            "Image", "User", "image@taskizy.com", "password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content):
+        return self.client.patch(
+            "/api/auth/get-users/me/",
+            {"user_image": SimpleUploadedFile("photo.png", content)},
+            format="multipart",
+        )
+
+    def test_uploads_are_downscaled_and_stored_by_the_worker(self):
+        photo = BytesIO()
+        Image.new("RGB", (1200, 800), "teal").save(photo, "PNG")
+
+        response = self.upload(photo.getvalue())
+
+        self.assertEqual(response.status_code, 205)
+        self.assertIsNone(response.data["user_image"])
+        self.assertTrue(UserImageUpload.objects.filter(user=self.user).exists())
+
+        call_command("upload_user_images", stdout=StringIO())
+        self.user.refresh_from_db()
+
+        self.assertFalse(UserImageUpload.objects.exists())
+        self.assertEqual(
+            self.user.user_image_url, f"/media/{self.user.user_image.name}"
+        )
+
+        with Image.open(self.user.user_image.path) as image:
+            self.assertEqual(image.size, (256, 171))
+            self.assertEqual(image.format, "JPEG")
+
+        response = self.client.get("/api/auth/get-users/me/")
+        self.assertEqual(response.data["user_image"], self.user.user_image_url)
+
+    def test_images_sent_at_registration_are_queued(self):
+        photo = BytesIO()
+        Image.new("RGB", (1200, 800), "teal").save(photo, "PNG")
+
+        response = APIClient().post(
+            "/api/auth/users/",
+            {
+                "email": "new@taskizy.com",
+                "first_name": "New",
+                "last_name": "User",
+                "password": "a-long-password",
+                "re_password": "a-long-password",
+                "user_image": SimpleUploadedFile("photo.png", photo.getvalue()),
+            },
+            format="multipart",
+        )
+        user = User.objects.get(email="new@taskizy.com")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data["user_image"])
+        self.assertFalse(user.user_image)
+        self.assertEqual(UserImageUpload.objects.get().user, user)
+
+    def test_invalid_images_are_rejected(self):
+        response = self.upload(b"not an image")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UserImageUpload.objects.exists())
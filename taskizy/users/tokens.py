@@ -0,0 +1,104 @@
+"""
+Refresh tokens whose blacklist lookups go through a bounded in-process cache.
+
+Blacklisted tokens never become valid again, so they are remembered until
+they expire. Tokens found not blacklisted are only remembered for
+`TOKEN_BLACKLIST_CACHE_TIMEOUT` seconds, which bounds how long another
+process may keep accepting a token after it was blacklisted there.
+Tokens blacklisted in this process are rejected at once.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic, time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class BlacklistCache:
+    """
+    Least recently used map of token ids to whether they are blacklisted,
+    holding at most `max_size` entries.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, jti):
+        with self.lock:
+            entry = self.entries.get(jti)
+
+            if entry is None:
+                return None
+
+            is_blacklisted, expires_at = entry
+
+            if expires_at <= monotonic():
+                del self.entries[jti]
+                return None
+
+            self.entries.move_to_end(jti)
+            return is_blacklisted
+
+    def set(self, jti, is_blacklisted, timeout):
+        if timeout <= 0:
+            return
+
+        with self.lock:
+            self.entries[jti] = (is_blacklisted, monotonic() + timeout)
+            self.entries.move_to_end(jti)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+blacklist_cache = BlacklistCache(settings.TOKEN_BLACKLIST_CACHE_SIZE)
+
+
+class CachedRefreshToken(RefreshToken):
+    def get_remaining_lifetime(self):
+        return self.payload["exp"] - time()
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        is_blacklisted = blacklist_cache.get(jti)
+
+        if is_blacklisted is None:
+            is_blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            blacklist_cache.set(
+                jti,
+                is_blacklisted,
+                timeout=(
+                    self.get_remaining_lifetime()
+                    if is_blacklisted
+                    else min(
+                        settings.TOKEN_BLACKLIST_CACHE_TIMEOUT,
+                        self.get_remaining_lifetime(),
+                    )
+                ),
+            )
+
+        if is_blacklisted:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted_token = super().blacklist()
+
+        blacklist_cache.set(
+            self.payload[api_settings.JTI_CLAIM],
+            True,
+            timeout=self.get_remaining_lifetime(),
+        )
+
+        return blacklisted_token
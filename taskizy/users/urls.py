@@ -1,11 +1,21 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import UsersListView, UserRetrieveUpdateDestroyView, LogoutView
+from taskizy.async_views import as_view
+from .views import (
+    InviteCandidatesListView,
+    AsyncInviteCandidatesListView,
+    UserRetrieveUpdateDestroyView,
+    LogoutView,
+)
 
 
 urlpatterns = [
-    path("get-users/<int:room_id>/", UsersListView.as_view(), name="get-room-users"),
+    path(
+        "get-users/<int:room_id>/",
+        as_view(InviteCandidatesListView, AsyncInviteCandidatesListView),
+        name="get-room-users",
+    ),
     path("get-users/me/", UserRetrieveUpdateDestroyView.as_view(), name="me-profile"),
     path("logout/", LogoutView.as_view(), name="logout"),
-    path("token/refresh/", LogoutView.as_view(), name="token-refresh"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
 ]
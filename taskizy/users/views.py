@@ -1,31 +1,75 @@
 from rest_framework.views import APIView
-from rest_framework.generics import RetrieveUpdateDestroyAPIView
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework.generics import ListAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework_simplejwt.tokens import TokenError
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
+from taskizy.async_views import AsyncAPIViewMixin
+from taskizy.pagination import InviteCandidatePagination
 from .serializers import UserSerializer
+from .tokens import CachedRefreshToken
 from rooms.models import RoomMember
+from rooms.permissions import IsRoomMember
 
 
 User = get_user_model()
 
 
-class UsersListView(APIView):
-    permission_classes = (IsAuthenticated,)
+class InviteCandidatesListView(ListAPIView):
+    """
+    Users that can be invited to a room, i.e. active users that are not
+    members of it yet, optionally filtered by `?search=` on their email and
+    names.
 
-    def get(self, request, room_id):
-        try:
-            member_queryset = RoomMember.objects.filter(room_id=room_id)
-            user_queryset = User.objects.exclude(is_superuser=True).exclude(
-                pk__in=[member.room_member_id for member in member_queryset]
-            )
-        except User.DoesNotExist:
-            return Response(status=status.HTTP_404_NOT_FOUND)
+    On Postgres the search matches substrings and is served by trigram
+    indexes, other databases match prefixes. At most `max_results` users
+    are matched, so neither the page nor its count scan the whole table.
+    """
+
+    serializer_class = UserSerializer
+    permission_classes = (IsAuthenticated, IsRoomMember)
+    pagination_class = InviteCandidatePagination
+    search_fields = ("email", "first_name", "last_name")
+    max_results = 100
+
+    def get_queryset(self):
+        members = RoomMember.objects.filter(
+            room_id=self.kwargs["room_id"], room_member=OuterRef("pk")
+        )
+        queryset = User.objects.filter(is_superuser=False, is_active=True).exclude(
+            Exists(members)
+        )
+        search = self.request.query_params.get("search", "").strip()
+
+        if search:
+            if connections[queryset.db].vendor == "postgresql":
+                lookup = "icontains"
+            else:
+                lookup = "istartswith"
+
+            query = Q()
+            for field in self.search_fields:
+                query |= Q(**{f"{field}__{lookup}": search})
+
+            queryset = queryset.filter(query)
+
+        return queryset.order_by("email")[: self.max_results]
+
+
+class AsyncInviteCandidatesListView(AsyncAPIViewMixin, InviteCandidatesListView):
+    """
+    Async InviteCandidatesListView, for the ASGI deployment.
+
+    The page of users and its count are queried through the async ORM.
+    """
 
-        serializer = UserSerializer(user_queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    async def get(self, request, *args, **kwargs):
+        page = await self.apaginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class UserRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
@@ -77,7 +121,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = CachedRefreshToken(refresh_token)
             token.blacklist()
             return Response(status=status.HTTP_205_RESET_CONTENT)
         except TokenError: